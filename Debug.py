@@ -1,13 +1,15 @@
-import json
 import os
 
+from .data_configuration import LocalData
+
 
 def should_debug_app_manager():
     # Check if it should on debug mode or not
     should_debug = False
-    with open(f"{os.getcwd()}{os.path.sep}local_data.json") as f:
+    # Parsed only when it changes
+    local_data = LocalData.load_cached_data(f"{os.getcwd()}{os.path.sep}local_data.json")
+    if local_data is not None:
         try:
-            local_data = json.load(f)
             args = local_data["arguments"]
             debug_elements = args["debug"]
             debug_list = [
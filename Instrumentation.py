@@ -0,0 +1,191 @@
+"""Timing of the app management operations
+
+Operations are timed with spans, which use the monotonic clock, and every
+duration is counted on a fixed-bucket latency histogram per operation and
+per app(or process name).
+
+It's disabled by default, when it's disabled a span does nothing, so the
+instrumented code costs a function call and a 'with'. It can be enabled with
+enable() or with the environment variable DEVTOOLS_INSTRUMENTATION=1.
+
+Example:
+```python
+from dev_tools_utils import Instrumentation
+
+Instrumentation.enable()
+with Instrumentation.span("AppManager.start_app", app_path):
+    ...
+
+@Instrumentation.timed("ProcessSnapshot.refresh")
+def refresh(self):
+    ...
+
+print(Instrumentation.dump())
+```
+"""
+import functools
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+
+# Upper bound of every bucket in seconds, there's one more bucket for the slower ones
+buckets = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+enabled = os.environ.get("DEVTOOLS_INSTRUMENTATION", "") not in ("", "0")
+
+# Operation -> key -> Histogram
+histograms: dict = {}
+histograms_lock = threading.Lock()
+
+
+def enable():
+    """Start recording spans"""
+    global enabled
+    enabled = True
+
+
+def disable():
+    """Stop recording spans, the recorded histograms are kept"""
+    global enabled
+    enabled = False
+
+
+def is_enabled() -> bool:
+    """Check if spans are being recorded"""
+    return enabled
+
+
+class Histogram:
+    def __init__(self):
+        """Fixed-bucket latency histogram"""
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, seconds: float, error: bool = False):
+        """Count a duration"""
+        self.counts[bisect_left(buckets, seconds)] += 1
+        self.count += 1
+        if error:
+            self.errors += 1
+        self.total += seconds
+        if self.min is None or seconds < self.min:
+            self.min = seconds
+        if self.max is None or seconds > self.max:
+            self.max = seconds
+
+    def to_dict(self) -> dict:
+        """Get the histogram, it's json serializable
+
+        The buckets are upper bound -> count, the last one is "+Inf" """
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "total": self.total,
+            "mean": self.total / self.count if self.count else None,
+            "min": self.min,
+            "max": self.max,
+            "buckets": {
+                **{str(bound): count for bound, count in zip(buckets, self.counts)},
+                "+Inf": self.counts[-1],
+            },
+        }
+
+
+def record(operation: str, key: str, seconds: float, error: bool = False):
+    """Count the duration of an operation"""
+    with histograms_lock:
+        operation_histograms = histograms.setdefault(operation, {})
+        histogram = operation_histograms.get(key)
+        if not histogram:
+            histogram = operation_histograms[key] = Histogram()
+        histogram.observe(seconds, error)
+
+
+class Span:
+    __slots__ = ("operation", "key", "start")
+
+    def __init__(self, operation: str, key: str = ""):
+        """Times the code inside a 'with' and records it when it ends"""
+        self.operation = operation
+        self.key = key
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.monotonic()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        record(self.operation, self.key, time.monotonic() - self.start, exc_type is not None)
+        return False
+
+
+class NullSpan:
+    """Span used when it's disabled, it does nothing"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+null_span = NullSpan()
+
+
+def span(operation: str, key: str = ""):
+    """Time an operation of an app, the key is usually the app path"""
+    if not enabled:
+        return null_span
+    return Span(operation, key)
+
+
+def timed(operation: str, get_key=None):
+    """Decorator that times every call of a function
+
+    get_key is called with the same arguments as the function to get the key"""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return fn(*args, **kwargs)
+            with Span(operation, get_key(*args, **kwargs) if get_key else ""):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def get_histograms() -> dict:
+    """Get every histogram, as a dictionary operation -> key -> histogram"""
+    with histograms_lock:
+        return {
+            operation: {key: histogram.to_dict() for key, histogram in operation_histograms.items()}
+            for operation, operation_histograms in histograms.items()
+        }
+
+
+def dump(path: str = None) -> str:
+    """Get every histogram as json, if a path is given it's also written there"""
+    data = json.dumps({
+        "buckets": list(buckets),
+        "histograms": get_histograms(),
+    }, indent=4)
+    if path:
+        with open(path, "w") as f:
+            f.write(data)
+    return data
+
+
+def reset():
+    """Discard every histogram"""
+    with histograms_lock:
+        histograms.clear()
@@ -0,0 +1,113 @@
+"""Json encoding and decoding
+
+Every json read or written by this package goes through here. If orjson is
+installed it's used, otherwise the standard library json module.
+
+The results are the same with both backends:
+loads() gives the same python objects, and dumps() gives json that decodes to
+the same objects(the spacing may differ) and raises TypeError for the same
+objects. Whatever orjson can't decode(e.g. NaN) or would encode differently
+falls back to the standard library: integers bigger than 64 bits, keys that
+aren't strings, NaN and Infinity(orjson writes null), and the types that only
+orjson supports(datetime, dataclasses, UUID, Enum) or whose subclasses it
+encodes as the base type.
+
+Reference/s:
+https://github.com/ijl/orjson
+"""
+import enum
+import json
+import math
+import uuid
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Name of the backend in use, "orjson" or "json"
+backend = "orjson" if orjson else "json"
+
+# Encoded the same way by both backends
+plain_types = frozenset((str, int, bool, type(None)))
+
+if orjson:
+    # The types that the standard library doesn't encode are given to default()
+    orjson_options = (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+                      | orjson.OPT_PASSTHROUGH_SUBCLASS)
+
+
+def set_backend(name: str):
+    """Use the given backend, "orjson" or "json" """
+    global backend
+    if name == "orjson" and not orjson:
+        raise Exception("orjson is not installed.")
+    if name not in ("orjson", "json"):
+        raise Exception(f"Unknown json backend: {name}")
+    backend = name
+
+
+def get_backends() -> list:
+    """Get the available backends"""
+    return ["orjson", "json"] if orjson else ["json"]
+
+
+def loads(data):
+    """Decode json from a str or bytes"""
+    if backend == "orjson":
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # It may be valid for the standard library(e.g. NaN)
+            pass
+    return json.loads(data)
+
+
+def reject(value):
+    """Default of orjson, what it doesn't encode like the standard library is encoded by it"""
+    raise TypeError(f"Type is not handled by orjson: {type(value).__name__}")
+
+
+def is_orjson_safe(data) -> bool:
+    """Check if orjson encodes the data like the standard library
+
+    Finds what the options can't pass through: NaN, Infinity, UUID and Enum values"""
+    pending = [data]
+    while pending:
+        value = pending.pop()
+        value_type = type(value)
+        if value_type in plain_types:
+            continue
+        if value_type is dict:
+            pending.extend(value.values())
+        elif value_type is list or value_type is tuple:
+            pending.extend(value)
+        elif value_type is float:
+            if not math.isfinite(value):
+                return False
+        elif isinstance(value, (uuid.UUID, enum.Enum)):
+            return False
+    return True
+
+
+def dumps(data, **kwargs) -> str:
+    """Encode data as json
+
+    The kwargs are given to json.dumps, orjson is only used when there are none"""
+    if backend == "orjson" and not kwargs and is_orjson_safe(data):
+        try:
+            return orjson.dumps(data, default=reject, option=orjson_options).decode("utf-8")
+        except TypeError:
+            # Not supported by orjson(orjson.JSONEncodeError is a TypeError)
+            pass
+    return json.dumps(data, **kwargs)
+
+
+def load(f):
+    """Decode json from a file object"""
+    return loads(f.read())
+
+
+def dump(data, f, **kwargs):
+    """Encode data as json into a file object opened in text mode"""
+    f.write(dumps(data, **kwargs))
@@ -1,7 +1,21 @@
 import platform
 import os
+import shlex
+import signal
 import subprocess
 
+# If a command has any of these, it's run by a shell
+shell_characters = set("|&;<>()$`\\*?[]{}~#!\n")
+shell_builtins = {
+    "cd", "export", "source", ".", "alias", "unset", "set", "eval", "exec",
+    "exit", "return", "ulimit", "umask", "shopt", "trap", "wait", "read",
+}
+# Shell syntax, some also exist as programs(e.g. /usr/bin/time), which behave differently
+shell_keywords = {
+    "time", "if", "then", "else", "elif", "fi", "for", "while", "until", "do", "done",
+    "case", "esac", "function", "select", "coproc", "!", "[[", "]]", "{", "}",
+}
+
 
 def get_platform_system(debug:bool=False):
     """ Some examples of platform module
@@ -51,8 +65,88 @@ def get_username(debug=False):
         return pwd.getpwuid(os.getuid())[0]
 
 
-def run_commands(raw_cmds: str, debug: bool = False):
-    """Run commands"""
+def split_command(raw_cmd: str):
+    """Split a simple command into an argv list
+
+    Returns None if the command needs a shell to run(pipes, redirections,
+    variables, globs, builtins, multiple commands, etc.)"""
+    raw_cmd = raw_cmd.strip()
+    if not raw_cmd or shell_characters.intersection(raw_cmd):
+        return None
+
+    try:
+        argv = shlex.split(raw_cmd)
+    except ValueError:
+        # Unbalanced quotes, let the shell report it
+        return None
+
+    # Environment variable assignments, builtins and keywords
+    if not argv or "=" in argv[0] or argv[0] in shell_builtins or argv[0] in shell_keywords:
+        return None
+    return argv
+
+
+def get_command_argv(raw_cmd: str, shell: str = "/bin/bash") -> list:
+    """Get the argv to run a command
+
+    Simple commands are run directly, otherwise they are run by a single shell"""
+    argv = split_command(raw_cmd)
+    if argv is None:
+        return [shell, "-c", raw_cmd]
+    return argv
+
+
+def popen_command(raw_cmd: str, shell: str = "/bin/bash", **kwargs) -> subprocess.Popen:
+    """Start a command without a shell if possible
+
+    The kwargs are given to subprocess.Popen"""
+    argv = get_command_argv(raw_cmd, shell)
+    try:
+        return subprocess.Popen(argv, **kwargs)
+    except FileNotFoundError:
+        if argv[0] == shell:
+            raise
+        # Let the shell find it or report that it doesn't exist
+        return subprocess.Popen([shell, "-c", raw_cmd], **kwargs)
+
+
+async def async_popen_command(raw_cmd: str, shell: str = "/bin/bash", **kwargs):
+    """Same as popen_command(), but it's an asyncio.subprocess.Process
+
+    The kwargs are given to asyncio.create_subprocess_exec"""
+    import asyncio
+
+    argv = get_command_argv(raw_cmd, shell)
+    try:
+        return await asyncio.create_subprocess_exec(*argv, **kwargs)
+    except FileNotFoundError:
+        if argv[0] == shell:
+            raise
+        # Let the shell find it or report that it doesn't exist
+        return await asyncio.create_subprocess_exec(shell, "-c", raw_cmd, **kwargs)
+
+
+def send_signal(pid: int, sig: int = 15, group: bool = False, debug: bool = False):
+    """Send a signal to a process, or to its process group if group is True
+
+    Returns False if the process doesn't exist"""
+    if debug:
+        print(f"\n- send_signal(): Sending signal {sig} to {'group ' if group else ''}{pid}")
+    try:
+        if group:
+            os.killpg(int(pid), sig)
+        else:
+            os.kill(int(pid), sig)
+    except ProcessLookupError:
+        return False
+    return True
+
+
+def run_commands(raw_cmds: str, on_start=None, debug: bool = False, **kwargs):
+    """Run commands
+
+    If on_start is given, it's called with the process right after it's created,
+    on linux the kwargs are given to subprocess.Popen(e.g. start_new_session)"""
     os_name = get_platform_system(debug=debug)
 
     if os_name in ["Windows32bit", "Windows64bit"]:
@@ -66,18 +160,18 @@ def run_commands(raw_cmds: str, debug: bool = False):
                                                      stdin=subprocess.PIPE,
                                                      stdout=subprocess.PIPE,
                                                      shell=True)
+        if on_start:
+            on_start(process)
         out, err = process.communicate(parsed_cmds)
     else:
-        parsed_cmds = bytes(raw_cmds, 'utf8')
-
+        # Simple commands are executed directly, the rest by a single shell
         # For subprocess.Popen()
         # It's recommended to use fully qualified paths, or
         # some things might be overriden
-        process: subprocess.Popen = subprocess.Popen(["/bin/bash", "-c"],
-                                                     stdin=subprocess.PIPE,
-                                                     stdout=subprocess.PIPE,
-                                                     shell=True)
-        out, err = process.communicate(parsed_cmds)
+        process: subprocess.Popen = popen_command(raw_cmds, stdout=subprocess.PIPE, **kwargs)
+        if on_start:
+            on_start(process)
+        out, err = process.communicate()
 
     if out:
         print(out.decode("utf-8"))
@@ -86,6 +180,179 @@ def run_commands(raw_cmds: str, debug: bool = False):
     return out, err
 
 
+class CommandStream:
+    def __init__(
+            self,
+            raw_cmds: str,
+            cwd: str = None,
+            tee_path: str = None,
+            max_line_length: int = 65536,
+            debug: bool = False):
+        """Run commands and iterate their output lines as they arrive
+
+        Stderr is merged into stdout, lines longer than max_line_length are split, so
+        the memory used doesn't depend on the output size. If tee_path is given, the
+        output is also appended to that file.
+        After the iteration ends, returncode has the exit code.
+
+        The commands run on their own process group, if the iteration is stopped
+        early(break) the whole group is killed.
+
+        Example:
+        ```python
+        stream = CommandStream("npm install", cwd=app_path)
+        for line in stream:
+            print(line)
+        print(stream.returncode)
+        ```"""
+        self.raw_cmds = raw_cmds
+        self.cwd = cwd
+        self.tee_path = tee_path
+        self.max_line_length = max_line_length
+        self.debug = debug
+
+        self.process = None
+        self.returncode = None
+        # Whether the last line was split because it was too long
+        self.split_line = False
+        # The async generator being iterated, see aclose()
+        self.async_iterator = None
+
+    def parse_line(self, line: bytes):
+        """Get the text of a line read from the output
+
+        Returns None for the new line that ends a split line, it's not an empty line"""
+        if self.split_line and line == b"\n":
+            self.split_line = False
+            return None
+        self.split_line = not line.endswith(b"\n")
+        return line.decode("utf-8", "replace").rstrip("\n")
+
+    def __iter__(self):
+        if self.debug:
+            print("\n- CommandStream: ", self.raw_cmds)
+
+        tee = open(self.tee_path, "ab") if self.tee_path else None
+        self.process = popen_command(
+            self.raw_cmds,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            cwd=self.cwd,
+            start_new_session=True)
+        self.split_line = False
+        finished = False
+        try:
+            while True:
+                line = self.process.stdout.readline(self.max_line_length)
+                if not line:
+                    finished = True
+                    break
+                if tee:
+                    tee.write(line)
+                text = self.parse_line(line)
+                if text is not None:
+                    yield text
+        finally:
+            self.process.stdout.close()
+            if tee:
+                tee.close()
+            if not finished:
+                # The iteration was stopped, nobody reads the output anymore
+                self.kill()
+            self.returncode = self.process.wait()
+
+    def kill(self):
+        """Kill the process group of the commands"""
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+    def __aiter__(self):
+        self.async_iterator = self.iterate_async()
+        return self.async_iterator
+
+    async def aclose(self):
+        """Stop the async iteration, the process group is killed if it's still running
+
+        After a break, the process keeps running until the async generator is closed,
+        which asyncio only does when it's garbage collected or the loop ends, call this
+        (or use 'async with') to close it right away and get the returncode"""
+        if self.async_iterator is not None:
+            await self.async_iterator.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.aclose()
+        return False
+
+    async def iterate_async(self):
+        """Same as iterating the stream, but using asyncio subprocesses
+
+        Example:
+        ```python
+        async with CommandStream("npm install", cwd=app_path) as stream:
+            async for line in stream:
+                if "ERR!" in line:
+                    break
+        print(stream.returncode)
+        ```"""
+        import asyncio
+
+        if self.debug:
+            print("\n- CommandStream (async): ", self.raw_cmds)
+
+        tee = open(self.tee_path, "ab") if self.tee_path else None
+        self.process = await async_popen_command(
+            self.raw_cmds,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+            cwd=self.cwd,
+            start_new_session=True,
+            limit=self.max_line_length)
+        self.split_line = False
+        finished = False
+        try:
+            while True:
+                try:
+                    line = await self.process.stdout.readuntil(b"\n")
+                except asyncio.LimitOverrunError as ex:
+                    # The line is too long, give the part that's already buffered
+                    # up to max_line_length, like readline() does
+                    line = await self.process.stdout.read(
+                        min(ex.consumed, self.max_line_length))
+                except asyncio.IncompleteReadError as ex:
+                    # The output ended without a new line
+                    line = ex.partial
+                if not line:
+                    finished = True
+                    break
+                if tee:
+                    tee.write(line)
+                text = self.parse_line(line)
+                if text is not None:
+                    yield text
+        finally:
+            if tee:
+                tee.close()
+            if not finished:
+                # The iteration was stopped, nobody reads the output anymore, the
+                # process only finishes once every process holding its pipe exits
+                self.kill()
+            self.returncode = await self.process.wait()
+
+
+def stream_commands(raw_cmds: str, cwd: str = None, tee_path: str = None, debug: bool = False):
+    """Run commands and get their output lines as they arrive
+
+    Can be iterated with 'for' and 'async for', see CommandStream"""
+    return CommandStream(raw_cmds, cwd=cwd, tee_path=tee_path, debug=debug)
+
+
 def create_folders_recursively(path: str):
     """Create folders recursively
 
@@ -1,7 +1,8 @@
 import os
-import json
 import shutil
 
+from .data_configuration import SettingsCache
+
 
 class VersionManager:
     versions_path = f"{os.getcwd()}{os.path.sep}.."
@@ -11,11 +12,10 @@ class VersionManager:
 
         # Get this application version and
         # get a list of integers of this application version
-        with open(f"{os.getcwd()}{os.path.sep}settings.json") as f:
-            self.app_info = json.load(f)
+        self.app_info = SettingsCache.get_app_settings(os.getcwd())
 
-            # Convert a version to an integer list
-            self.current_version_list = self.version_to_int_list(self.app_info["version"])
+        # Convert a version to an integer list
+        self.current_version_list = self.version_to_int_list(self.app_info["version"])
 
     def get_highest_version(self) -> str:
         """Get the highest version
@@ -35,12 +35,11 @@ class VersionManager:
         """Check if the app at the path is this application"""
         # Verify that it's this app
         try:
-            with open(path) as f:
-                temp_data = json.load(f)
+            temp_data = SettingsCache.get_settings(path)
 
-                # It's not the same program/application
-                if not temp_data["name"] == self.app_info["name"]:
-                    return False
+            # It's not the same program/application
+            if not temp_data["name"] == self.app_info["name"]:
+                return False
         except Exception as ex:
             # It doesn't have settings.json, therefore is not this app
             return False
@@ -110,20 +109,19 @@ class VersionManager:
             print("Versions path: ", self.versions_path)
             print("Folders: ", folders)
 
-        with open(f"{os.getcwd()}{os.path.sep}settings.json") as f:
-            app_info = json.load(f)
-            current_version = []
-            # It could be like this 1.1.1-beta
-            # Basically it first splits the -(result: [1.1.1, beta])
-            # then it takes the first item, which in
-            # this case would be 1.1.1, then it is split again
-            # and the result will be [1, 1, 1]
-            for version in app_info["version"].replace("v", "") \
-                    .split("-")[0].split("."):
-                try:
-                    current_version.append(int(version))
-                except Exception as ex:
-                    pass
+        app_info = SettingsCache.get_app_settings(os.getcwd())
+        current_version = []
+        # It could be like this 1.1.1-beta
+        # Basically it first splits the -(result: [1.1.1, beta])
+        # then it takes the first item, which in
+        # this case would be 1.1.1, then it is split again
+        # and the result will be [1, 1, 1]
+        for version in app_info["version"].replace("v", "") \
+                .split("-")[0].split("."):
+            try:
+                current_version.append(int(version))
+            except Exception as ex:
+                pass
 
         if debug:
             print("\nCurrent version: ", current_version)
@@ -137,15 +135,14 @@ class VersionManager:
 
             # Verify that it's this app
             try:
-                with open(f"{self.versions_path}{os.path.sep}"
-                          f"{app_version}{os.path.sep}settings.json") as f:
-                    temp_data = json.load(f)
-
-                    # It's not the same program/application
-                    if not temp_data["name"] == app_info["name"]:
-                        if debug:
-                            print("It's not this application, skipping...")
-                        continue
+                temp_data = SettingsCache.get_settings(
+                    f"{self.versions_path}{os.path.sep}{app_version}{os.path.sep}settings.json")
+
+                # It's not the same program/application
+                if not temp_data["name"] == app_info["name"]:
+                    if debug:
+                        print("It's not this application, skipping...")
+                    continue
             except Exception as ex:
                 # It doesn't have settings.json
                 if debug:
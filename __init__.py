@@ -1,8 +1,37 @@
-import json
-import copy
+"""Dev tools utils
 
-from . import OStuff
-from .data_configuration import DBPath
+The modules and subpackages are imported the first time they are used, so
+importing the package doesn't load(or read files for) the parts that are not
+needed, e.g. dev_tools_utils.app_manager is imported on its first access."""
+import copy
+import importlib
+
+from . import JsonCodec
+
+# Imported on their first access, see __getattr__
+lazy_modules = (
+    "Debug",
+    "Instrumentation",
+    "OStuff",
+    "Tasks",
+    "VersionManager",
+    "app_manager",
+    "benchmarks",
+    "data_configuration",
+    "dbs",
+    "django_utils",
+    "dynamic_imports",
+    "local_repository_manager",
+    "os_stuff",
+    "tests",
+)
+
+
+def __getattr__(name: str):
+    """Import a module or subpackage the first time it's used"""
+    if name in lazy_modules:
+        return importlib.import_module(f".{name}", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def load_repository_settings_data(
@@ -16,11 +45,13 @@ def load_repository_settings_data(
 
     There are multiple things that must be done to load this correctly.
     If no instance of a database is given, it creates a new one."""
+    from .data_configuration import DBPath
+
     try:
-        from ..sqlite3_utils import Sqlite3Utils
+        from .dbs import ConnectionPool
     except:
         print("Warning: dev_tools_utils -> load_repository_settings_data():")
-        print("sqlite3_utils submodule not found.")
+        print("py_sqlite3_utils submodule not found(imported by dbs.ConnectionPool).")
         return
 
     if debug:
@@ -28,10 +59,10 @@ def load_repository_settings_data(
         print(f"Column name: {column_name}")
         print(f"username: {username}")
 
-    # If no instance of a database was given, create a new one just this once
+    # If no instance of a database was given, use the shared one of this thread
     if not sql_repository_settings:
         db_path = DBPath.get_sql_db_path(db_filename)
-        sql_repository_settings = Sqlite3Utils(db_path, "repository_settings")
+        sql_repository_settings = ConnectionPool.get_sqlite3_utils(db_path, "repository_settings")
 
     # This might throw an error
     try:
@@ -55,9 +86,9 @@ def load_repository_settings_data(
         item = data[i]
         try:
             # Load enabled
-            enabled = json.loads(item["enabled"])["value"]
+            enabled = JsonCodec.loads(item["enabled"])["value"]
 
-            setup_finalized = json.loads(item["setup_finalized"])["value"]
+            setup_finalized = JsonCodec.loads(item["setup_finalized"])["value"]
             if isinstance(setup_finalized, dict):
                 setup_finalized = setup_finalized["value"]
 
@@ -168,7 +199,7 @@ def try_get(sql_settings_table, key_name, debug=False):
         # Double level deep:
         # {'key': 'fetch_repositories', 'value': '{"type": "bool", "value": true}'}
         try:
-            data = json.loads(value)
+            data = JsonCodec.loads(value)
             if debug:
                 print(f"Second level: ", data)
             value = data["value"] \
@@ -0,0 +1,143 @@
+"""Output of the started apps
+
+The stdout and stderr of every started app are written to a log file under
+the data path:
+    {data_path}/logs/{username}/{app_name}.log
+
+When the file gets bigger than max_bytes it's rotated(app.log -> app.log.1,
+app.log.1 -> app.log.2, ...), and only the last backups are kept.
+
+Apps started in the background(StartApp, AppManager.start_app) get the log file
+itself as their stdout and stderr(see open_app_log), no pipe is involved, so
+they keep running after this program ends. Their log is rotated before they
+are started.
+
+The output of processes that this program keeps alive(see Supervisor) goes
+through pipes instead, which are drained into a RotatingLog, rotated while
+they run.
+
+Only for linux.
+"""
+import os
+import threading
+
+from ..data_configuration import DataLocation
+
+default_max_bytes = 10 * 1024 * 1024
+default_backups = 3
+
+def get_logs_path() -> str:
+    """Get the folder where the app logs are stored, it's created if it doesn't exist"""
+    path = f"{DataLocation.get_data_path()}{os.path.sep}logs"
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def get_log_path(app_path: str) -> str:
+    """Get the log file of the app at the given path"""
+    app_name = app_path.split(os.path.sep)[-1]
+    username = app_path.split(os.path.sep)[-2]
+    folder = f"{get_logs_path()}{os.path.sep}{username}"
+    os.makedirs(folder, exist_ok=True)
+    return f"{folder}{os.path.sep}{app_name}.log"
+
+
+def rotate_file(path: str, backups: int = default_backups):
+    """Move a log file to its first backup(app.log -> app.log.1, app.log.1 -> app.log.2, ...)
+
+    Only the last backups are kept, with no backups the file is removed"""
+    if backups > 0:
+        for i in range(backups - 1, 0, -1):
+            source = f"{path}.{i}"
+            if os.path.exists(source):
+                os.replace(source, f"{path}.{i + 1}")
+        os.replace(path, f"{path}.1")
+    else:
+        os.remove(path)
+
+
+def open_app_log(app_path: str, max_bytes: int = default_max_bytes, backups: int = default_backups):
+    """Open the log file of an app, to be given as the stdout and stderr of the app
+
+    It's opened in append mode(O_APPEND), so the app writes straight to the file
+    and keeps running when this program ends. The file is rotated first if it's
+    bigger than max_bytes, because it can't be rotated while the app is running."""
+    path = get_log_path(app_path)
+    try:
+        if os.path.getsize(path) > max_bytes:
+            rotate_file(path, backups)
+    except FileNotFoundError:
+        pass
+    return open(path, "ab")
+
+
+def tail_file(path: str, n: int = 10, block_size: int = 8192) -> list:
+    """Get the last n lines of a file
+
+    The file is read backwards by blocks from the end, until it has enough lines"""
+    if n <= 0:
+        return []
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return []
+
+    with f:
+        position = f.seek(0, os.SEEK_END)
+        data = b""
+        # One more new line than lines, the one before the first line
+        while position > 0 and data.count(b"\n") <= n:
+            size = min(block_size, position)
+            position -= size
+            f.seek(position)
+            data = f.read(size) + data
+
+    lines = data.decode("utf-8", "replace").split("\n")
+    # The file ends with a new line
+    if lines and lines[-1] == "":
+        lines.pop()
+    return lines[-n:]
+
+
+def tail(app_path: str, n: int = 10) -> list:
+    """Get the last n lines of the output of an app"""
+    return tail_file(get_log_path(app_path), n)
+
+
+class RotatingLog:
+    def __init__(
+            self,
+            path: str,
+            max_bytes: int = default_max_bytes,
+            backups: int = default_backups):
+        """Log file rotated by size"""
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.lock = threading.Lock()
+
+        self.file = open(self.path, "ab")
+        self.size = self.file.tell()
+
+    def write(self, data: bytes):
+        """Append data to the log, it's rotated first if it would get too big"""
+        with self.lock:
+            if self.file.closed:
+                return
+            if self.size and self.size + len(data) > self.max_bytes:
+                self.rotate()
+            self.file.write(data)
+            self.file.flush()
+            self.size += len(data)
+
+    def rotate(self):
+        """Move the current file to the first backup and start a new one"""
+        self.file.close()
+        rotate_file(self.path, self.backups)
+        self.file = open(self.path, "wb")
+        self.size = 0
+
+    def close(self):
+        """Close the log file"""
+        with self.lock:
+            self.file.close()
@@ -0,0 +1,56 @@
+"""Index of running processes by their cwd
+
+Built from a single scan of the process table, it answers "which processes
+run under this path or its subfolders" with a binary search, so checking many
+repositories doesn't compare every process cwd against every path.
+
+The cwds are stored sorted with a trailing separator, every cwd under a path
+starts with '<path>/', which makes them contiguous in the sorted list.
+"""
+import bisect
+import os
+
+
+def path_to_key(path: str) -> str:
+    """Get the index key of a path, the path with a trailing separator"""
+    path = os.path.abspath(path)
+    if path.endswith(os.path.sep):
+        return path
+    return f"{path}{os.path.sep}"
+
+
+class CwdIndex:
+    def __init__(self, processes: list):
+        """Build the index
+
+        The processes are the raw processes of a ProcessSnapshot or ProcScanner.scan(add_cwd=True),
+        processes whose cwd couldn't be read are not indexed."""
+        entries = sorted(
+            (path_to_key(process["cwd"]), process["pid"])
+            for process in processes
+            if process.get("cwd"))
+        self.keys: list = [entry[0] for entry in entries]
+        self.pids: list = [entry[1] for entry in entries]
+
+    def get_pids(self, path: str, subfolders: bool = True) -> list:
+        """Get the pids of the processes running at the given path
+
+        If subfolders is True, processes running in subfolders are included"""
+        key = path_to_key(path)
+        start = bisect.bisect_left(self.keys, key)
+        if subfolders:
+            # Every key that starts with the given key is before this one
+            end = bisect.bisect_left(self.keys, f"{key}\U0010ffff", start)
+        else:
+            end = bisect.bisect_right(self.keys, key, start)
+        return self.pids[start:end]
+
+    def get_pids_by_paths(self, paths: list, subfolders: bool = True) -> dict:
+        """Get the pids running at each path, as a dictionary path -> pids"""
+        return {path: self.get_pids(path, subfolders) for path in paths}
+
+    def is_running(self, path: str) -> bool:
+        """Check if there's at least one process running under the given path"""
+        key = path_to_key(path)
+        i = bisect.bisect_left(self.keys, key)
+        return i < len(self.keys) and self.keys[i].startswith(key)
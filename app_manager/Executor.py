@@ -0,0 +1,61 @@
+"""Thread pool shared by the threaded operations of every AppManager
+
+The operations are queued on a bounded pool instead of starting a new thread
+each, so restarting hundreds of apps at once runs at most max_workers of them
+at the same time.
+
+The size is read from the local data:
+```json
+"app_manager_max_workers": 8
+```
+By default it's the same as concurrent.futures.ThreadPoolExecutor.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from ..data_configuration import DataLocation, LocalData
+
+local_data_key = "app_manager_max_workers"
+
+# Shared by every AppManager of this process
+shared_executor = None
+shared_executor_lock = threading.Lock()
+
+
+def get_max_workers() -> int:
+    """Get how many operations can run at the same time"""
+    try:
+        data = LocalData.load_cached_data(DataLocation.get_local_settings_path())
+        max_workers = int(data[local_data_key])
+        if max_workers > 0:
+            return max_workers
+    except Exception:
+        pass
+    return min(32, (os.cpu_count() or 1) + 4)
+
+
+def get_shared_executor() -> ThreadPoolExecutor:
+    """Get the thread pool shared by the whole program"""
+    global shared_executor
+    with shared_executor_lock:
+        if not shared_executor:
+            shared_executor = ThreadPoolExecutor(
+                max_workers=get_max_workers(),
+                thread_name_prefix="AppManager")
+    return shared_executor
+
+
+def submit(fn, *args, **kwargs):
+    """Run a function on the shared pool, returns a concurrent.futures.Future"""
+    return get_shared_executor().submit(fn, *args, **kwargs)
+
+
+def shutdown(wait: bool = True, cancel_futures: bool = False):
+    """Stop the shared pool, a new one is created if it's used again"""
+    global shared_executor
+    with shared_executor_lock:
+        executor = shared_executor
+        shared_executor = None
+    if executor:
+        executor.shutdown(wait=wait, cancel_futures=cancel_futures)
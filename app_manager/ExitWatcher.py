@@ -0,0 +1,173 @@
+"""Get notified when processes exit
+
+Uses a pidfd(linux >= 5.3) for every watched pid, all of them are registered
+on a single selector which runs on a background thread, so exits arrive as
+events instead of scanning the process table again and again.
+
+If pidfds are not supported, the watched pids are checked with os.kill(pid, 0)
+on the same thread every poll_interval seconds.
+
+Reference/s:
+https://man7.org/linux/man-pages/man2/pidfd_open.2.html
+https://docs.python.org/3/library/os.html#os.pidfd_open
+"""
+import os
+import selectors
+import threading
+import time
+
+from .SelectorThread import SelectorThread
+
+# Shared by every AppManager of this process
+shared_watcher = None
+shared_watcher_lock = threading.Lock()
+
+
+def get_shared_watcher():
+    """Get the exit watcher shared by the whole program"""
+    global shared_watcher
+    with shared_watcher_lock:
+        if not shared_watcher:
+            shared_watcher = ExitWatcher()
+    return shared_watcher
+
+
+def is_pidfd_supported() -> bool:
+    """Check if pidfds can be used on this system"""
+    if not hasattr(os, "pidfd_open"):
+        return False
+    try:
+        os.close(os.pidfd_open(os.getpid()))
+    except OSError:
+        return False
+    return True
+
+
+class WatchedProcess:
+    def __init__(self, pid: int, fd: int = None, key: str = None):
+        """A watched process, fd is None when it's polled"""
+        self.pid = pid
+        self.fd = fd
+        self.key = key
+        self.exited = threading.Event()
+        self.exit_time = None
+        self.callbacks: list = []
+
+
+class ExitWatcher(SelectorThread):
+    def __init__(self, poll_interval: float = 0.5, debug: bool = False):
+        """Watches processes until they exit"""
+        super().__init__()
+        self.poll_interval = poll_interval
+        self.debug = debug
+
+        self.use_pidfd = is_pidfd_supported()
+        # Pid -> WatchedProcess
+        self.processes: dict = {}
+        self.lock = threading.Lock()
+
+    def watch(self, pid: int, callback=None, key: str = None) -> WatchedProcess:
+        """Watch a pid until it exits
+
+        The callback is called with the pid from the watcher thread once it exits,
+        the key(e.g. the app path) can be used to get the pids later."""
+        with self.lock:
+            watched = self.processes.get(pid)
+            if watched:
+                if callback:
+                    watched.callbacks.append(callback)
+                if key:
+                    watched.key = key
+                return watched
+
+            fd = None
+            if self.use_pidfd:
+                try:
+                    fd = os.pidfd_open(pid)
+                except ProcessLookupError:
+                    watched = WatchedProcess(pid, key=key)
+                    watched.exit_time = time.monotonic()
+                    watched.exited.set()
+                    if callback:
+                        callback(pid)
+                    return watched
+
+            watched = WatchedProcess(pid, fd, key)
+            if callback:
+                watched.callbacks.append(callback)
+            self.processes[pid] = watched
+            if fd is not None:
+                self.selector.register(fd, selectors.EVENT_READ, pid)
+            self.start_thread()
+
+        # Pick the new pid(or the new poll timeout)
+        self.wakeup()
+        return watched
+
+    def get_pids(self, key: str) -> list:
+        """Get the watched pids of the given key that are still running"""
+        with self.lock:
+            return [watched.pid for watched in self.processes.values() if watched.key == key]
+
+    def is_alive(self, pid: int) -> bool:
+        """Check if a watched pid is still running"""
+        with self.lock:
+            return pid in self.processes
+
+    def wait_for_exit(self, pids: list, timeout: float = None) -> bool:
+        """Wait until every given pid exits
+
+        Pids that are not watched are watched first, returns False if some pid is still
+        running after the timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        events = [self.watch(pid).exited for pid in pids]
+        for exited in events:
+            remaining = None if deadline is None else max(deadline - time.monotonic(), 0)
+            if not exited.wait(remaining):
+                return False
+        return True
+
+    def get_polled(self) -> list:
+        """Get the watched processes without a pidfd"""
+        with self.lock:
+            return [watched for watched in self.processes.values() if watched.fd is None]
+
+    def get_timeout(self):
+        """Polled processes are checked every poll_interval seconds"""
+        return self.poll_interval if self.get_polled() else None
+
+    def on_event(self, key: selectors.SelectorKey):
+        """A pidfd is readable when its process exits"""
+        self.on_exit(key.data)
+
+    def after_select(self):
+        """Check the polled processes"""
+        for watched in self.get_polled():
+            try:
+                os.kill(watched.pid, 0)
+            except ProcessLookupError:
+                self.on_exit(watched.pid)
+            except PermissionError:
+                # It exists, but it's from another user
+                pass
+
+    def on_exit(self, pid: int):
+        """Stop watching the pid and notify it exited"""
+        with self.lock:
+            watched = self.processes.pop(pid, None)
+            if not watched:
+                return
+            if watched.fd is not None:
+                self.selector.unregister(watched.fd)
+                os.close(watched.fd)
+
+        if self.debug:
+            print(f"ExitWatcher -> on_exit(): {pid} exited")
+
+        watched.exit_time = time.monotonic()
+        watched.exited.set()
+        for callback in watched.callbacks:
+            try:
+                callback(pid)
+            except Exception as ex:
+                print("Exception: ", ex)
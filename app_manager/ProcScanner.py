@@ -0,0 +1,347 @@
+"""Get process info by reading /proc directly
+
+Produces the same dictionaries that ProcessInfo builds from the output of
+'ps -eo ... | grep name', but without spawning 'bash', 'ps', 'grep' or one
+'readlink' per process, everything is read in a single pass.
+
+Only for linux, use is_available() before using it.
+
+Reference/s:
+https://man7.org/linux/man-pages/man5/proc.5.html
+https://man7.org/linux/man-pages/man1/ps.1.html
+"""
+import os
+import pwd
+import time
+
+proc_path = "/proc"
+
+# Format specifiers that can be built from /proc without calling 'ps'
+supported_format_specifiers = {
+    "euser", "user", "euid", "uid",
+    "pid", "ppid", "pgid", "pgrp", "sid",
+    "c", "stime", "tty", "tt", "time",
+    "cmd", "args", "comm", "rss", "nlwp",
+}
+
+# 'ps' shows the command line in a single line
+whitespace_to_spaces = str.maketrans("\n\r\t", "   ")
+
+
+def is_available() -> bool:
+    """Check if /proc can be used to get process information"""
+    return os.path.isdir(f"{proc_path}{os.path.sep}self")
+
+
+def supports(format_specifiers: list) -> bool:
+    """Check if every format specifier can be built from /proc"""
+    for specifier in format_specifiers:
+        if specifier not in supported_format_specifiers:
+            return False
+    return True
+
+
+def format_cpu_time(seconds: int) -> str:
+    """Format cumulative cpu time like 'ps' does, [DD-]HH:MM:SS"""
+    days, seconds = divmod(seconds, 86400)
+    hours, seconds = divmod(seconds, 3600)
+    minutes, seconds = divmod(seconds, 60)
+    if days:
+        return f"{days}-{hours:02d}:{minutes:02d}:{seconds:02d}"
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+
+
+def format_tty(tty_nr: int) -> str:
+    """Get the controlling terminal name from the tty_nr field of /proc/<pid>/stat"""
+    if tty_nr == 0:
+        return "?"
+
+    major = (tty_nr >> 8) & 0xfff
+    minor = (tty_nr & 0xff) | ((tty_nr >> 12) & 0xfff00)
+    # Unix98 pseudo terminals
+    if 136 <= major <= 143:
+        return f"pts/{(major - 136) * 256 + minor}"
+    # Virtual consoles and serial ports
+    if major == 4:
+        return f"tty{minor}" if minor < 64 else f"ttyS{minor - 64}"
+    return "?"
+
+
+class ProcScanner:
+    # Username cache, the uid -> name lookup is slow
+    usernames: dict = {}
+
+    def __init__(self, debug: bool = False):
+        """Reads the process table from /proc"""
+        self.debug = debug
+
+        self.clock_ticks = os.sysconf("SC_CLK_TCK")
+        self.page_size = os.sysconf("SC_PAGE_SIZE")
+        self.boot_time = self.get_boot_time()
+
+    def get_boot_time(self) -> int:
+        """Get the time the system booted, in seconds since the epoch"""
+        with open(f"{proc_path}{os.path.sep}stat") as f:
+            for line in f:
+                if line.startswith("btime"):
+                    return int(line.split()[1])
+        return 0
+
+    def get_pids(self) -> list:
+        """Get every pid in the process table"""
+        return [int(name) for name in os.listdir(proc_path) if name.isdigit()]
+
+    def get_username(self, uid: int) -> str:
+        """Get username by uid"""
+        username = self.usernames.get(uid)
+        if username is None:
+            try:
+                username = pwd.getpwuid(uid).pw_name
+            except KeyError:
+                # The user doesn't exist, 'ps' shows the uid instead
+                username = str(uid)
+            self.usernames[uid] = username
+        return username
+
+    def read_stat(self, pid: int):
+        """Read /proc/<pid>/stat
+
+        Returns the command name and the fields after it, or None if
+        the process doesn't exist anymore"""
+        try:
+            with open(f"{proc_path}/{pid}/stat", "rb") as f:
+                stat = f.read().decode("utf-8", "replace")
+        except OSError:
+            return None
+
+        # The command name is between parentheses and may contain spaces
+        # and parentheses itself, so the last ')' is where it ends
+        comm_start = stat.find("(")
+        comm_end = stat.rfind(")")
+        return stat[comm_start + 1:comm_end], stat[comm_end + 2:].split()
+
+    def update_from_stat(self, process: dict, comm: str, fields: list):
+        """Update the values that change while the process runs
+
+        The fields are the ones returned by read_stat()"""
+        process["comm"] = comm
+        process["ppid"] = int(fields[1])
+        process["pgrp"] = int(fields[2])
+        process["session"] = int(fields[3])
+        process["tty_nr"] = int(fields[4])
+        process["utime"] = int(fields[11])
+        process["stime"] = int(fields[12])
+        process["num_threads"] = int(fields[17])
+        process["starttime"] = int(fields[19])
+        process["rss"] = int(fields[21])
+        return process
+
+    def read_process(self, pid: int, add_cwd: bool = False, stat=None):
+        """Read the process information of the given pid
+
+        Returns a dictionary with the raw values or None if the process
+        doesn't exist anymore, if the stat was already read it can be given
+        so it isn't read twice. The "cwd" key is only set when add_cwd is True."""
+        if not stat:
+            stat = self.read_stat(pid)
+            if not stat:
+                return None
+        comm, fields = stat
+
+        process = {
+            "pid": pid,
+            "uid": None,
+            "euid": None,
+            "cmdline": [],
+        }
+        self.update_from_stat(process, comm, fields)
+        self.update_cmdline(process)
+        self.update_uids(process)
+
+        if add_cwd:
+            process["cwd"] = self.read_cwd(pid)
+
+        return process
+
+    def update_cmdline(self, process: dict):
+        """Read the arguments of the process again, they change with execve or setproctitle"""
+        try:
+            with open(f"{proc_path}/{process['pid']}/cmdline", "rb") as f:
+                cmdline = f.read()
+            process["cmdline"] = [
+                arg.decode("utf-8", "replace") for arg in cmdline.split(b"\0") if arg]
+        except OSError:
+            pass
+        return process
+
+    def update_uids(self, process: dict):
+        """Read the real and effective uid of the process again, they change with setuid"""
+        try:
+            with open(f"{proc_path}/{process['pid']}/status", "rb") as f:
+                for line in f:
+                    if line.startswith(b"Uid:"):
+                        uids = line.split()
+                        process["uid"] = int(uids[1])
+                        process["euid"] = int(uids[2])
+                        break
+        except OSError:
+            pass
+        return process
+
+    def read_cwd(self, pid: int):
+        """Get cwd by pid, None if it can't be read(e.g. not enough permissions)"""
+        try:
+            return os.readlink(f"{proc_path}/{pid}/cwd")
+        except OSError:
+            return None
+
+    def scan(self, add_cwd: bool = False) -> list:
+        """Read every process in the process table"""
+        result = []
+        for pid in self.get_pids():
+            process = self.read_process(pid, add_cwd)
+
+            # It finished while scanning
+            if process:
+                result.append(process)
+        return result
+
+    def format_stime(self, process: dict, now: float) -> str:
+        """Format the start time like 'ps' does"""
+        start = self.boot_time + process["starttime"] / self.clock_ticks
+        start_time = time.localtime(start)
+
+        # Less than a day ago the hour is shown, otherwise the date
+        if now - start < 86400:
+            return time.strftime("%H:%M", start_time)
+        if start_time.tm_year == time.localtime(now).tm_year:
+            return time.strftime("%b%d", start_time)
+        return time.strftime("%Y", start_time)
+
+    def format_value(self, process: dict, specifier: str, now: float) -> str:
+        """Get the value of a format specifier as 'ps' would show it"""
+        if specifier == "pid":
+            return str(process["pid"])
+        if specifier == "ppid":
+            return str(process["ppid"])
+        if specifier in ("cmd", "args"):
+            if process["cmdline"]:
+                return " ".join(process["cmdline"]).translate(whitespace_to_spaces)
+            # Kernel threads don't have command line
+            return f"[{process['comm']}]"
+        if specifier in ("euser", "user"):
+            euid = process["euid"]
+            if euid is None:
+                return "?"
+            username = self.get_username(euid)
+            # Same as 'ps', names longer than the column are truncated
+            if len(username) > 8:
+                return f"{username[:7]}+"
+            return username
+        if specifier in ("euid", "uid"):
+            return str(process[specifier])
+        if specifier in ("pgid", "pgrp"):
+            return str(process["pgrp"])
+        if specifier == "sid":
+            return str(process["session"])
+        if specifier in ("tty", "tt"):
+            return format_tty(process["tty_nr"])
+        if specifier == "time":
+            return format_cpu_time(
+                (process["utime"] + process["stime"]) // self.clock_ticks)
+        if specifier == "stime":
+            return self.format_stime(process, now)
+        if specifier == "c":
+            uptime = now - self.boot_time - process["starttime"] / self.clock_ticks
+            if uptime <= 0:
+                return "0"
+            cpu_seconds = (process["utime"] + process["stime"]) / self.clock_ticks
+            return str(min(int(cpu_seconds * 100 / uptime), 99))
+        if specifier == "comm":
+            return process["comm"]
+        if specifier == "rss":
+            return str(process["rss"] * self.page_size // 1024)
+        if specifier == "nlwp":
+            return str(process["num_threads"])
+        raise KeyError(f"Format specifier '{specifier}' is not supported.")
+
+    def process_to_dictionary(self, process: dict, format_specifiers: list, now: float):
+        """Convert the raw process information to the dictionary ProcessInfo uses"""
+        return {
+            specifier: self.format_value(process, specifier, now)
+            for specifier in format_specifiers
+        }
+
+    def filter_by_name(
+            self,
+            processes: list,
+            name: str,
+            format_specifiers: list,
+            add_cwd: bool = False) -> list:
+        """Get the info of the processes that match the given name
+
+        Same as 'ps -eo <format_specifiers> | grep <name>', the name is searched
+        on the whole line of the process, but the grep process itself isn't matched."""
+        now = time.time()
+        result = []
+        for process in processes:
+            info = self.process_to_dictionary(process, format_specifiers, now)
+            if name not in " ".join(info.values()):
+                continue
+
+            if add_cwd:
+                # Cwd is read only if the process matches
+                if "cwd" in process:
+                    info["cwd"] = process["cwd"]
+                else:
+                    info["cwd"] = self.read_cwd(process["pid"])
+            result.append(info)
+
+        return result
+
+    def get_process_names(self, process: dict) -> set:
+        """Get the names a process can be found by
+
+        Its command name, every argument and the basename of every argument, e.g.
+        'python3 /apps/server.py' can be found by python3, server.py or the full path"""
+        names = {process["comm"]}
+        for arg in process["cmdline"]:
+            names.add(arg)
+            names.add(os.path.basename(arg))
+        return names
+
+    def filter_by_names(
+            self,
+            processes: list,
+            names: list,
+            format_specifiers: list,
+            add_cwd: bool = False) -> dict:
+        """Get the info of the processes that match exactly any of the given names
+
+        Returns a dictionary name -> list of process info"""
+        now = time.time()
+        wanted = set(names)
+        result = {name: [] for name in names}
+        for process in processes:
+            matches = wanted.intersection(self.get_process_names(process))
+            if not matches:
+                continue
+
+            info = self.process_to_dictionary(process, format_specifiers, now)
+            if add_cwd:
+                if "cwd" in process:
+                    info["cwd"] = process["cwd"]
+                else:
+                    info["cwd"] = self.read_cwd(process["pid"])
+            for name in matches:
+                result[name].append(info)
+
+        return result
+
+    def get_processes_info_by_name(
+            self,
+            name: str,
+            format_specifiers: list,
+            add_cwd: bool = False) -> list:
+        """Get process info by name reading the whole process table"""
+        return self.filter_by_name(self.scan(), name, format_specifiers, add_cwd)
@@ -0,0 +1,149 @@
+"""Process groups of the started apps
+
+Apps are started on a new session(start_new_session=True), so the app and
+every process it starts share a process group whose id is the pid of the
+first process. The group id and the start time of its leader are saved on
+the local data:
+```json
+"process_groups": {
+    "/home/user/.devtools/repositories/user/app": {"pgid": 12345, "starttime": 678}
+}
+```
+Stopping the whole app is a single os.killpg, without scanning the process
+table to find its children.
+
+A saved group is validated by reading only /proc/<pgid>/stat, the leader must
+still have the same start time(otherwise the pid was reused) and group. Only
+when the leader is gone(the rest of the group may still run) the process table
+is scanned, to check if some process of the group runs in the app folder.
+
+Only for linux.
+"""
+import os
+
+from ..data_configuration import DataLocation, LocalData
+from . import ProcessSnapshot
+
+local_data_key = "process_groups"
+
+
+def get_saved_groups() -> dict:
+    """Get every saved group, as a dictionary app path -> saved group"""
+    data = LocalData.load_cached_data(DataLocation.get_local_settings_path())
+    if not isinstance(data, dict):
+        return {}
+    # The cached data is shared
+    return dict(data.get(local_data_key) or {})
+
+
+def get_saved_group(app_path: str) -> tuple:
+    """Get the saved pgid and leader start time of an app, (None, None) if there's none
+
+    Groups saved only as a pgid have no start time"""
+    group = get_saved_groups().get(app_path)
+    if isinstance(group, dict):
+        return group.get("pgid"), group.get("starttime")
+    return group, None
+
+
+def read_leader(pgid: int) -> tuple:
+    """Get the group and start time of the leader of a group, (None, None) if it's not running"""
+    stat = ProcessSnapshot.get_shared_snapshot().scanner.read_stat(pgid)
+    if not stat:
+        return None, None
+    _, fields = stat
+    return int(fields[2]), int(fields[19])
+
+
+def save_pgid(app_path: str, pgid: int):
+    """Save the process group of an app, with the start time of its leader"""
+    _, starttime = read_leader(pgid)
+    group = {"pgid": int(pgid), "starttime": starttime}
+
+    def update(data: dict):
+        data[local_data_key] = {**(data.get(local_data_key) or {}), app_path: group}
+
+    # Apps started at the same time(or by other processes) would overwrite each other
+    LocalData.update_data(update)
+
+
+def remove_pgid(app_path: str):
+    """Forget the process group of an app"""
+    if app_path not in get_saved_groups():
+        return
+
+    def update(data: dict):
+        groups = dict(data.get(local_data_key) or {})
+        groups.pop(app_path, None)
+        data[local_data_key] = groups
+
+    LocalData.update_data(update)
+
+
+def get_group_pids(pgid: int, fresh: bool = False) -> list:
+    """Get the pids of the processes in a group"""
+    processes = ProcessSnapshot.get_shared_snapshot().get_processes(fresh)
+    return [process["pid"] for process in processes if process["pgrp"] == pgid]
+
+
+def is_app_group(app_path: str, pgid: int, fresh: bool = False) -> bool:
+    """Check if some process of the group runs in the app folder or its subfolders"""
+    # Never our own group
+    if pgid == os.getpgrp():
+        return False
+    app_pids = set(ProcessSnapshot.get_shared_snapshot().get_cwd_index(fresh).get_pids(app_path))
+    return any(pid in app_pids for pid in get_group_pids(pgid))
+
+
+def get_pgid(app_path: str, fresh: bool = False):
+    """Get the saved process group of an app, None if there's none or it's not running
+
+    The process table is only scanned if the leader is gone or its start time wasn't saved"""
+    pgid, starttime = get_saved_group(app_path)
+    if pgid is None:
+        return None
+    # Never our own group
+    if pgid == os.getpgrp():
+        remove_pgid(app_path)
+        return None
+
+    leader_pgrp, leader_starttime = read_leader(pgid)
+    if leader_starttime is not None and starttime is not None:
+        if leader_starttime != starttime:
+            # The pid was reused, so the group is gone, a pgid isn't reused while it exists
+            remove_pgid(app_path)
+            return None
+        if leader_pgrp == pgid:
+            return pgid
+
+    # The leader is gone or it left the group, the rest of the group may still run
+    if not is_app_group(app_path, pgid, fresh):
+        remove_pgid(app_path)
+        return None
+    return pgid
+
+
+def find_pgid(app_path: str, fresh: bool = False):
+    """Find the process group of an app that was started by someone else
+
+    It's the group whose leader runs in the app folder, None if there's none"""
+    snapshot = ProcessSnapshot.get_shared_snapshot()
+    app_pids = set(snapshot.get_cwd_index(fresh).get_pids(app_path))
+    own_pgid = os.getpgrp()
+    for pid in sorted(app_pids):
+        process = snapshot.get_process(pid)
+        if process and process["pgrp"] in app_pids and process["pgrp"] != own_pgid:
+            return process["pgrp"]
+    return None
+
+
+def adopt(app_path: str, fresh: bool = True):
+    """Save the process group of an app that's already running
+
+    Returns the pgid, None if it's not running in its own group"""
+    pgid = get_pgid(app_path, fresh)
+    if pgid is None:
+        pgid = find_pgid(app_path)
+        if pgid is not None:
+            save_pgid(app_path, pgid)
+    return pgid
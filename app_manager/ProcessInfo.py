@@ -5,13 +5,24 @@ to get the path is a bit slow though.
 
 IMPORTANT: Even if I don't use it, don't remove it unless I make a better version of it.
 
+On linux the process table is read directly from /proc(see ProcScanner), the
+'ps' command is only used as a fallback. The /proc scans are kept on a
+ProcessSnapshot shared by every instance, which is refreshed when it's older
+than its ttl, or when fresh=True is given.
+
 Reference/s:
 https://realpython.com/python-subprocess/#processes-and-subprocesses
 https://stackoverflow.com/questions/606041/how-do-i-get-the-path-of-a-process-in-unix-linux
 https://man7.org/linux/man-pages/man1/ps.1.html
 """
+import os
 import subprocess
 
+from .. import Instrumentation
+from . import ProcScanner
+from . import ProcessRecord
+from . import ProcessSnapshot
+
 
 class ProcessInfo:
     def __init__(
@@ -19,11 +30,19 @@ class ProcessInfo:
             process_name: str,
             format_specifiers: list = [],
             add_cwd: bool = False,
+            engine: str = "auto",
+            snapshot: ProcessSnapshot.ProcessSnapshot = None,
             debug: bool = False):
-        """Note that for the cwd it's required to have the pid"""
+        """Note that for the cwd it's required to have the pid
+
+        The engine can be "proc"(read /proc directly), "ps"(use the ps command) or
+        "auto", which uses /proc when it's available.
+        If no snapshot is given, the shared one is used."""
         self.process_name = process_name
         self.format_specifiers = format_specifiers
         self.add_cwd = add_cwd
+        self.engine = engine
+        self.snapshot = snapshot
         self.debug = debug
 
         # If no format specifiers are given
@@ -34,6 +53,13 @@ class ProcessInfo:
             # but in reality their names are different
             self.format_specifiers = "euser,pid,ppid,c,stime,tty,time,cmd".split(",")
 
+    def should_use_proc(self, format_specifiers: list) -> bool:
+        """Check if the process table can be read from /proc"""
+        if self.engine == "ps":
+            return False
+        return ProcScanner.is_available() and ProcScanner.supports(format_specifiers)
+
+    @Instrumentation.timed("ProcessInfo.run_subprocess")
     def run_subprocess(self, cmd: str):
         """Run a subprocess"""
         try:
@@ -86,28 +112,11 @@ class ProcessInfo:
 
     def parse_info(self, pinfo: str, format_names: list):
         """Parse any kind of info given by the output of the ps command"""
-        result = {}
-
-        for i in range(len(format_names)):
-            # If it's the last one, just add it directly
-            if i == len(format_names) - 1:
-                result[format_names[i]] = pinfo
-                break
-
-            # The first is username
-            try:
-                format_value, remaining = pinfo.split(' ', maxsplit=1)
-                result[format_names[i]] = format_value
-            except Exception as ex:
-                # Sometimes the last element is empty, thus
-                # this would throw an error
-                if self.debug:
-                    print("Exception: ", ex)
-                break
-            remaining = remaining.strip()
-            pinfo = remaining
-
-        return result
+        # The line is split only once, the last one gets the rest of the line
+        values = pinfo.split(None, len(format_names) - 1)
+        if values:
+            values[-1] = values[-1].rstrip()
+        return dict(zip(format_names, values))
 
     def parse_cwd(self, cwd: str):
         """Parse cwd to human-readable"""
@@ -132,18 +141,13 @@ class ProcessInfo:
 
         Convert proces data returned by using 'ps' command to a
         dictionary list"""
-        plist = process_data.split('\n')
-        result = []
-
-        for i in range(len(plist)):
-            process: str = plist[i]
-
-            # Get process info as  a dictionary
-            parsed_info: dict = self.parse_info(process, format_specifiers)
+        # Grep didn't match anything
+        if not process_data:
+            return []
 
-            # Check if it's empty
-            if len(list(parsed_info.keys())) <= 0:
-                continue
+        result = []
+        for values in ProcessRecord.split_lines(process_data, format_specifiers):
+            parsed_info: dict = dict(zip(format_specifiers, values))
 
             if self.add_cwd:
                 # Get cwd by pid
@@ -155,8 +159,78 @@ class ProcessInfo:
 
         return result
 
-    def get_processes_info_by_name(self):
-        """Get process info by name"""
+    def custom_process_data_to_records(
+                self,
+                process_data: str,
+                format_specifiers: list
+            ) -> list:
+        """Convert process data to a list of ProcessRecord
+
+        Records are read-only dictionaries that share the field names, the cwd
+        is not added"""
+        return ProcessRecord.parse_records(process_data, format_specifiers)
+
+    def custom_process_data_to_table(
+                self,
+                process_data: str,
+                format_specifiers: list
+            ) -> ProcessRecord.ProcessTable:
+        """Convert process data to column arrays, better for many processes"""
+        return ProcessRecord.parse_table(process_data, format_specifiers)
+
+    def get_ps_process_names(self, pid: str, command: str) -> set:
+        """Get the names a process listed by ps can be found by
+
+        The same as the ones of /proc(see ProcScanner.get_process_names), if /proc
+        can't be read, the words of the command and their basenames"""
+        scanner = self.get_snapshot().scanner
+        stat = scanner.read_stat(pid) if pid.isdigit() else None
+        if stat:
+            process = scanner.update_cmdline({"pid": pid, "comm": stat[0], "cmdline": []})
+            return scanner.get_process_names(process)
+
+        process_names = set()
+        for arg in command.split():
+            process_names.add(arg)
+            process_names.add(os.path.basename(arg))
+        return process_names
+
+    def get_snapshot(self) -> ProcessSnapshot.ProcessSnapshot:
+        """Get the process table snapshot used by this instance"""
+        if not self.snapshot:
+            self.snapshot = ProcessSnapshot.get_shared_snapshot()
+        return self.snapshot
+
+    def get_proc_processes_info_by_name(
+            self,
+            name: str,
+            format_specifiers: list,
+            fresh: bool = False):
+        """Get process info by name reading /proc
+
+        Returns None if /proc couldn't be read"""
+        try:
+            return self.get_snapshot().get_processes_info_by_name(
+                name, format_specifiers, self.add_cwd, fresh)
+        except OSError as exc:
+            if self.debug:
+                print(f"Couldn't read the process table from /proc, using ps instead.\n{exc}")
+        return None
+
+    @Instrumentation.timed(
+        "ProcessInfo.get_processes_info_by_name",
+        lambda self, *args, **kwargs: self.process_name)
+    def get_processes_info_by_name(self, fresh: bool = False):
+        """Get process info by name
+
+        If fresh is True, the process table is read again even if the last scan
+        is still up to date"""
+        if self.should_use_proc(self.format_specifiers):
+            pdata = self.get_proc_processes_info_by_name(
+                self.process_name, self.format_specifiers, fresh)
+            if pdata is not None:
+                return pdata
+
         process_str_data = self.get_custom_processes_by_name(
             self.process_name, self.format_specifiers)
         pdata = self.custom_process_data_to_dictionary_list(
@@ -164,11 +238,77 @@ class ProcessInfo:
             self.format_specifiers)
         return pdata
 
-    def get_custom_processes_info_by_name(self, name: str, format_specifiers: list = []):
+    @Instrumentation.timed(
+        "ProcessInfo.get_custom_processes_info_by_name",
+        lambda self, name, *args, **kwargs: name)
+    def get_custom_processes_info_by_name(
+            self,
+            name: str,
+            format_specifiers: list = [],
+            fresh: bool = False):
         """Get process info by name"""
         if len(format_specifiers) <= 0:
             format_specifiers = self.format_specifiers
 
+        if self.should_use_proc(format_specifiers):
+            pdata = self.get_proc_processes_info_by_name(name, format_specifiers, fresh)
+            if pdata is not None:
+                return pdata
+
         process_str_data = self.get_custom_processes_by_name(name, format_specifiers)
         pdata = self.custom_process_data_to_dictionary_list(process_str_data, format_specifiers)
         return pdata
+
+    @Instrumentation.timed("ProcessInfo.get_processes_info_by_names")
+    def get_processes_info_by_names(
+            self,
+            names: list,
+            format_specifiers: list = [],
+            fresh: bool = False) -> dict:
+        """Get process info of many names with a single scan of the process table
+
+        Unlike get_custom_processes_info_by_name(), the names must match exactly the
+        command name, an argument or the basename of an argument.
+        When ps is used, the arguments are still read from /proc, only if /proc can't
+        be read they are the words of the command(ps joins them with spaces), so an
+        argument with spaces(e.g. bash -c "sleep 300") is matched by each of its words.
+        Returns a dictionary name -> list of process info"""
+        if len(format_specifiers) <= 0:
+            format_specifiers = self.format_specifiers
+
+        if self.should_use_proc(format_specifiers):
+            try:
+                return self.get_snapshot().get_processes_info_by_names(
+                    names, format_specifiers, self.add_cwd, fresh)
+            except OSError as exc:
+                if self.debug:
+                    print(f"Couldn't read the process table from /proc, using ps instead.\n{exc}")
+
+        # The pid and the command are needed to match the names
+        ps_format_specifiers = list(format_specifiers)
+        if "pid" not in ps_format_specifiers:
+            # First, the command may have spaces so it must be the last one
+            ps_format_specifiers.insert(0, "pid")
+        if "cmd" not in ps_format_specifiers and "args" not in ps_format_specifiers:
+            ps_format_specifiers.append("args")
+        process_data = self.run_subprocess(f"ps -eo {','.join(ps_format_specifiers)}")
+
+        wanted = set(names)
+        result = {name: [] for name in names}
+        # The first line is the header
+        for values in ProcessRecord.split_lines(process_data, ps_format_specifiers)[1:]:
+            parsed_info: dict = dict(zip(ps_format_specifiers, values))
+            command = parsed_info.get("cmd", parsed_info.get("args", ""))
+            process_names = self.get_ps_process_names(parsed_info["pid"], command)
+
+            matches = wanted.intersection(process_names)
+            if not matches:
+                continue
+
+            info = {specifier: parsed_info.get(specifier) for specifier in format_specifiers}
+            if self.add_cwd:
+                info["cwd"] = self.get_cwd(info["pid"])
+            for name in matches:
+                result[name].append(info)
+
+        return result
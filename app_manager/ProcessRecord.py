@@ -0,0 +1,102 @@
+"""Compact process records parsed from the output of 'ps'
+
+Every line is split once, the values are stored as they come and the field
+names are shared by every record of the same output, instead of building a
+dictionary per line.
+
+For big outputs ProcessTable stores the values as column arrays, records are
+only built when a row is requested.
+"""
+from collections.abc import Mapping
+
+
+class ProcessRecord(Mapping):
+    """Read-only dictionary view of a parsed line
+
+    The index maps field name -> position and it's shared between records"""
+    __slots__ = ("index", "values")
+
+    def __init__(self, index: dict, values):
+        self.index = index
+        self.values = values
+
+    def __getitem__(self, key):
+        i = self.index[key]
+        # Incomplete lines don't have the last fields
+        if i >= len(self.values) or self.values[i] is None:
+            raise KeyError(key)
+        return self.values[i]
+
+    def __iter__(self):
+        for key, i in self.index.items():
+            if i < len(self.values) and self.values[i] is not None:
+                yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"ProcessRecord({self.to_dict()})"
+
+    def to_dict(self) -> dict:
+        """Get a normal dictionary with the values of the record"""
+        return {key: value for key, value in zip(self.index, self.values) if value is not None}
+
+
+class ProcessTable:
+    def __init__(self, fields: list, rows: list):
+        """Process values stored by column
+
+        Rows shorter than the fields are filled with None"""
+        self.fields = list(fields)
+        self.index = {field: i for i, field in enumerate(self.fields)}
+        self.length = len(rows)
+
+        width = len(self.fields)
+        padded = (row if len(row) == width else row + [None] * (width - len(row))
+                  for row in rows)
+        columns = list(zip(*padded)) if rows else [() for _ in self.fields]
+        self.columns: dict = dict(zip(self.fields, columns))
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, i: int) -> ProcessRecord:
+        return ProcessRecord(self.index, [column[i] for column in self.columns.values()])
+
+    def __iter__(self):
+        for values in zip(*self.columns.values()):
+            yield ProcessRecord(self.index, values)
+
+    def get_column(self, field: str) -> tuple:
+        """Get every value of a field"""
+        return self.columns[field]
+
+
+def split_lines(process_data: str, fields: list) -> list:
+    """Split every non-empty line of the 'ps' output in its fields
+
+    The last field gets the rest of the line, since the command may have spaces"""
+    if not process_data:
+        return []
+
+    maxsplit = len(fields) - 1
+    rows = []
+    for line in process_data.splitlines():
+        values = line.split(None, maxsplit)
+        if values:
+            # The last field keeps the inner spaces, but not the ones at the end
+            values[-1] = values[-1].rstrip()
+            rows.append(values)
+    return rows
+
+
+def parse_records(process_data: str, fields: list) -> list:
+    """Parse the 'ps' output into a list of records"""
+    index = {field: i for i, field in enumerate(fields)}
+    return [ProcessRecord(index, values) for values in split_lines(process_data, fields)]
+
+
+def parse_table(process_data: str, fields: list) -> ProcessTable:
+    """Parse the 'ps' output into column arrays"""
+    return ProcessTable(fields, split_lines(process_data, fields))
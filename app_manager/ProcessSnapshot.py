@@ -0,0 +1,151 @@
+"""Process table snapshot
+
+Keeps the last scan of the process table in memory, so many queries in a row
+don't read the whole /proc every time.
+
+When the snapshot is older than its ttl it's refreshed incrementally, only the
+processes that are new or whose start time changed(the pid was reused) are read
+completely again, the ones that finished are dropped. The known processes only
+read again what can change without changing the pid: their stat, cmdline and
+cwd(execve, chdir, setproctitle), and their uids if the command name changed
+or the refresh was requested with fresh=True(setuid).
+"""
+import threading
+import time
+
+from .. import Instrumentation
+from .CwdIndex import CwdIndex
+from .ProcScanner import ProcScanner
+
+# Shared by every ProcessInfo and AppManager of this process
+shared_snapshot = None
+shared_snapshot_lock = threading.Lock()
+
+
+def get_shared_snapshot(ttl: float = None):
+    """Get the snapshot shared by the whole program
+
+    If the ttl is given, the ttl of the shared snapshot is updated"""
+    global shared_snapshot
+    with shared_snapshot_lock:
+        if not shared_snapshot:
+            shared_snapshot = ProcessSnapshot() if ttl is None else ProcessSnapshot(ttl)
+        elif ttl is not None:
+            shared_snapshot.ttl = ttl
+    return shared_snapshot
+
+
+class ProcessSnapshot:
+    def __init__(self, ttl: float = 1.0, debug: bool = False):
+        """Process table snapshot
+
+        The ttl is how many seconds a scan is considered up to date"""
+        self.ttl = ttl
+        self.debug = debug
+
+        self.scanner = ProcScanner(debug=debug)
+        # Pid -> raw process information given by ProcScanner.read_process()
+        self.processes: dict = {}
+        self.last_refresh = None
+        # Built on demand, it's discarded when the snapshot is refreshed
+        self.cwd_index = None
+        self.lock = threading.Lock()
+
+    def is_stale(self) -> bool:
+        """Check if the snapshot is older than the ttl"""
+        if self.last_refresh is None:
+            return True
+        return time.monotonic() - self.last_refresh >= self.ttl
+
+    def is_refreshed_since(self, moment: float) -> bool:
+        """Check if the snapshot was refreshed after the given time.monotonic()"""
+        return self.last_refresh is not None and self.last_refresh >= moment
+
+    @Instrumentation.timed("ProcessSnapshot.refresh")
+    def refresh(self, full: bool = False):
+        """Update the snapshot
+
+        The processes that are already known read again their stat(to get their cpu
+        time and detect if the pid was reused), cmdline and cwd. Their uids are read
+        again if the command name changed or full is True."""
+        processes: dict = {}
+        new_pids = 0
+        for pid in self.scanner.get_pids():
+            stat = self.scanner.read_stat(pid)
+            if not stat:
+                # It finished while scanning
+                continue
+
+            comm, fields = stat
+            previous = self.processes.get(pid)
+            if previous and previous["starttime"] == int(fields[19]):
+                # A copy, the previous one may be used by a CwdIndex given before
+                process = dict(previous)
+                self.scanner.update_from_stat(process, comm, fields)
+                self.scanner.update_cmdline(process)
+                process["cwd"] = self.scanner.read_cwd(pid)
+                if full or previous["comm"] != comm:
+                    self.scanner.update_uids(process)
+                processes[pid] = process
+                continue
+
+            # New process or the pid was reused
+            process = self.scanner.read_process(pid, add_cwd=True, stat=stat)
+            if process:
+                processes[pid] = process
+                new_pids += 1
+
+        if self.debug:
+            print(f"ProcessSnapshot -> refresh(): {len(processes)} processes, "
+                  f"{new_pids} new, {len(set(self.processes) - set(processes))} finished")
+
+        self.processes = processes
+        self.last_refresh = time.monotonic()
+        self.cwd_index = None
+
+    def get_processes(self, fresh: bool = False) -> list:
+        """Get the raw information of every process
+
+        If fresh is True, the snapshot is refreshed even if it's not stale"""
+        with self.lock:
+            if fresh or self.is_stale():
+                self.refresh(full=fresh)
+            return list(self.processes.values())
+
+    def get_process(self, pid: int, fresh: bool = False):
+        """Get the raw information of a process, None if it's not running"""
+        with self.lock:
+            if fresh or self.is_stale():
+                self.refresh(full=fresh)
+            return self.processes.get(pid)
+
+    def get_cwd_index(self, fresh: bool = False) -> CwdIndex:
+        """Get the processes indexed by cwd
+
+        The index is shared until the snapshot is refreshed"""
+        with self.lock:
+            if fresh or self.is_stale():
+                self.refresh(full=fresh)
+            if not self.cwd_index:
+                self.cwd_index = CwdIndex(list(self.processes.values()))
+            return self.cwd_index
+
+    def get_processes_info_by_name(
+            self,
+            name: str,
+            format_specifiers: list,
+            add_cwd: bool = False,
+            fresh: bool = False) -> list:
+        """Get process info by name, like ProcScanner.get_processes_info_by_name()"""
+        return self.scanner.filter_by_name(
+            self.get_processes(fresh), name, format_specifiers, add_cwd)
+
+    def get_processes_info_by_names(
+            self,
+            names: list,
+            format_specifiers: list,
+            add_cwd: bool = False,
+            fresh: bool = False) -> dict:
+        """Get process info of many names at once, like ProcScanner.filter_by_names()"""
+        return self.scanner.filter_by_names(
+            self.get_processes(fresh), names, format_specifiers, add_cwd)
@@ -0,0 +1,184 @@
+"""Readiness checks
+
+Used to know when an app that was just started is ready, instead of assuming
+it started because it kept running for a second.
+
+They are declared on the devtools section of the app settings.json:
+```json
+"devtools": {
+    "readiness": {
+        "timeout": 30,
+        "checks": [
+            {"type": "tcp", "port": 8000},
+            {"type": "http", "port": 8000, "path": "/health"},
+            {"type": "log", "path": "logs/app.log", "pattern": "Listening on"},
+            {"type": "pidfile", "path": "app.pid"}
+        ]
+    }
+}
+```
+Relative paths are relative to the app folder. The app is ready when every
+check passes, they are polled with an interval that starts at a few
+milliseconds and grows, so fast apps are ready almost immediately.
+"""
+import os
+import re
+import socket
+import time
+
+default_timeout = 30.0
+
+
+class TcpCheck:
+    def __init__(self, port: int, host: str = "127.0.0.1"):
+        """Ready when the port accepts connections"""
+        self.host = host
+        self.port = int(port)
+
+    def is_ready(self) -> bool:
+        try:
+            with socket.create_connection((self.host, self.port), timeout=0.25):
+                return True
+        except OSError:
+            return False
+
+
+class HttpCheck:
+    def __init__(self, port: int, path: str = "/", host: str = "127.0.0.1", status: int = 200):
+        """Ready when a GET to the path returns the given status"""
+        self.host = host
+        self.port = int(port)
+        self.path = path
+        self.status = int(status)
+
+    def is_ready(self) -> bool:
+        # Only imported by the apps that use it, it's slow to import
+        import http.client
+
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=1)
+        try:
+            connection.request("GET", self.path)
+            return connection.getresponse().status == self.status
+        except (OSError, http.client.HTTPException):
+            return False
+        finally:
+            connection.close()
+
+
+class LogCheck:
+    def __init__(self, path: str, pattern: str):
+        """Ready when a line of the log file matches the pattern
+
+        Only the lines written after the check is created are searched"""
+        self.path = path
+        self.pattern = re.compile(pattern)
+        try:
+            self.position = os.path.getsize(self.path)
+        except OSError:
+            self.position = 0
+        self.partial_line = ""
+
+    def is_ready(self) -> bool:
+        try:
+            with open(self.path, errors="replace") as f:
+                # The file was rotated or truncated
+                if os.fstat(f.fileno()).st_size < self.position:
+                    self.position = 0
+                f.seek(self.position)
+                data = f.read()
+                self.position = f.tell()
+        except OSError:
+            return False
+
+        lines = (self.partial_line + data).split("\n")
+        # The last one may not be complete yet
+        self.partial_line = lines.pop()
+        for line in lines:
+            if self.pattern.search(line):
+                return True
+        return False
+
+
+class PidfileCheck:
+    def __init__(self, path: str):
+        """Ready when the pidfile exists and has a pid"""
+        self.path = path
+
+    def is_ready(self) -> bool:
+        try:
+            with open(self.path) as f:
+                return f.read().strip().isdigit()
+        except OSError:
+            return False
+
+
+def create_check(app_path: str, check: dict):
+    """Create a readiness check from its settings"""
+    check_type = check.get("type")
+    if check_type == "tcp":
+        return TcpCheck(check["port"], check.get("host", "127.0.0.1"))
+    if check_type == "http":
+        return HttpCheck(
+            check["port"],
+            check.get("path", "/"),
+            check.get("host", "127.0.0.1"),
+            check.get("status", 200))
+    if check_type == "log":
+        return LogCheck(os.path.join(app_path, check["path"]), check["pattern"])
+    if check_type == "pidfile":
+        return PidfileCheck(os.path.join(app_path, check["path"]))
+    raise Exception(f"Unknown readiness check type: {check_type}")
+
+
+def create_checks(app_path: str, readiness) -> list:
+    """Create the readiness checks of an app
+
+    The readiness can be the whole readiness settings or just the list of checks"""
+    if not readiness:
+        return []
+    if isinstance(readiness, dict):
+        readiness = readiness.get("checks", [])
+    return [create_check(app_path, check) for check in readiness]
+
+
+def get_timeout(readiness) -> float:
+    """Get the readiness timeout from the readiness settings"""
+    if isinstance(readiness, dict) and "timeout" in readiness:
+        return float(readiness["timeout"])
+    return default_timeout
+
+
+def wait_until_ready(
+        process,
+        checks: list,
+        timeout: float = default_timeout,
+        initial_interval: float = 0.005,
+        max_interval: float = 0.25,
+        debug: bool = False) -> bool:
+    """Wait until every check passes
+
+    Returns False if the process fails(exits with an error) or the timeout expires.
+    If the process exits successfully, it's assumed that it left the app running
+    in the background, and the checks are still polled."""
+    deadline = time.monotonic() + timeout
+    interval = initial_interval
+    pending = list(checks)
+    while True:
+        pending = [check for check in pending if not check.is_ready()]
+        if not pending:
+            return True
+
+        returncode = process.poll() if process else None
+        if returncode:
+            if debug:
+                print(f"The app exited with code {returncode} before it was ready.")
+            return False
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            if debug:
+                print(f"The app wasn't ready after {timeout} seconds, pending checks: ", pending)
+            return False
+
+        time.sleep(min(interval, remaining))
+        interval = min(interval * 2, max_interval)
@@ -0,0 +1,233 @@
+"""Resource usage sampler for the apps managed by AppManager
+
+A single background thread reads /proc/<pid>/stat and /proc/<pid>/statm of
+the processes running in every tracked app folder every interval seconds.
+
+The samples are stored on preallocated ring buffers backed by 'array', once
+they are full the oldest samples are overwritten, so the memory used doesn't
+grow with the uptime.
+"""
+import os
+import threading
+import time
+from array import array
+
+from . import ProcessSnapshot
+
+# Shared by every AppManager of this process
+shared_sampler = None
+shared_sampler_lock = threading.Lock()
+
+
+def get_shared_sampler(interval: float = None, capacity: int = None):
+    """Get the sampler shared by the whole program
+
+    The interval and capacity are only used when it's created"""
+    global shared_sampler
+    with shared_sampler_lock:
+        if not shared_sampler:
+            kwargs = {}
+            if interval is not None:
+                kwargs["interval"] = interval
+            if capacity is not None:
+                kwargs["capacity"] = capacity
+            shared_sampler = ResourceSampler(**kwargs)
+    return shared_sampler
+
+
+def percentile(sorted_values: list, percent: float):
+    """Get the percentile of already sorted values(nearest rank)"""
+    if not sorted_values:
+        return None
+    rank = max(int(round(percent / 100 * len(sorted_values))) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+class RingBuffer:
+    def __init__(self, typecode: str, capacity: int):
+        """Fixed size buffer, when it's full the oldest value is overwritten"""
+        self.capacity = capacity
+        self.values = array(typecode, [0] * capacity)
+        # Position of the next value
+        self.position = 0
+        self.length = 0
+
+    def __len__(self):
+        return self.length
+
+    def append(self, value):
+        """Add a value"""
+        self.values[self.position] = value
+        self.position = (self.position + 1) % self.capacity
+        self.length = min(self.length + 1, self.capacity)
+
+    def to_list(self) -> list:
+        """Get the values from the oldest to the newest"""
+        if self.length < self.capacity:
+            return self.values[:self.length].tolist()
+        return (self.values[self.position:] + self.values[:self.position]).tolist()
+
+
+class ResourceHistory:
+    def __init__(self, capacity: int):
+        """Resource samples of a single app"""
+        self.time = RingBuffer("d", capacity)
+        self.cpu_percent = RingBuffer("d", capacity)
+        self.rss = RingBuffer("q", capacity)
+        self.threads = RingBuffer("l", capacity)
+
+        # Used to get the cpu usage between samples
+        self.last_cpu_ticks = None
+        self.last_time = None
+
+    def add_sample(self, now: float, cpu_ticks: int, rss: int, threads: int, clock_ticks: int):
+        """Add a sample, the cpu ticks are the cumulative ticks of every process"""
+        cpu_percent = 0.0
+        if self.last_cpu_ticks is not None and now > self.last_time:
+            # If a process finished the cumulative ticks go down
+            ticks = max(cpu_ticks - self.last_cpu_ticks, 0)
+            cpu_percent = ticks / clock_ticks / (now - self.last_time) * 100
+        self.last_cpu_ticks = cpu_ticks
+        self.last_time = now
+
+        self.time.append(time.time())
+        self.cpu_percent.append(cpu_percent)
+        self.rss.append(rss)
+        self.threads.append(threads)
+
+    def to_dict(self) -> dict:
+        """Get every sample, from the oldest to the newest"""
+        return {
+            "time": self.time.to_list(),
+            "cpu_percent": self.cpu_percent.to_list(),
+            "rss": self.rss.to_list(),
+            "threads": self.threads.to_list(),
+        }
+
+    def get_summary(self) -> dict:
+        """Get the p50, p95 and max of every resource, it's json serializable"""
+        summary = {"samples": len(self.time)}
+        for name, buffer in [
+                    ("cpu_percent", self.cpu_percent),
+                    ("rss", self.rss),
+                    ("threads", self.threads),
+                ]:
+            values = sorted(buffer.to_list())
+            summary[name] = {
+                "p50": percentile(values, 50),
+                "p95": percentile(values, 95),
+                "max": values[-1] if values else None,
+            }
+        return summary
+
+
+class ResourceSampler:
+    def __init__(self, interval: float = 5.0, capacity: int = 720, debug: bool = False):
+        """Samples cpu, rss and threads of the tracked apps
+
+        By default it keeps an hour of samples, every 5 seconds"""
+        self.interval = interval
+        self.capacity = capacity
+        self.debug = debug
+
+        self.clock_ticks = os.sysconf("SC_CLK_TCK")
+        self.page_size = os.sysconf("SC_PAGE_SIZE")
+
+        # App path -> ResourceHistory
+        self.histories: dict = {}
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def track(self, path: str):
+        """Start sampling the app at the given path"""
+        with self.lock:
+            if path not in self.histories:
+                self.histories[path] = ResourceHistory(self.capacity)
+        self.start()
+
+    def untrack(self, path: str):
+        """Stop sampling the app at the given path and discard its samples"""
+        with self.lock:
+            self.histories.pop(path, None)
+
+    def start(self):
+        """Start the sampler thread, if it's not running"""
+        with self.lock:
+            if self.thread and self.thread.is_alive():
+                return
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        """Stop the sampler thread"""
+        self.stop_event.set()
+
+    def run(self):
+        """Sampler thread"""
+        while not self.stop_event.is_set():
+            try:
+                self.sample()
+            except Exception as ex:
+                print("ResourceSampler -> run(): Exception: ", ex)
+            self.stop_event.wait(self.interval)
+
+    def read_usage(self, pid: int):
+        """Get the cpu ticks, rss in bytes and threads of a process
+
+        Returns None if the process finished"""
+        try:
+            with open(f"/proc/{pid}/stat", "rb") as f:
+                stat = f.read()
+            with open(f"/proc/{pid}/statm", "rb") as f:
+                statm = f.read()
+        except OSError:
+            return None
+
+        # The fields after the command name, which may contain spaces
+        fields = stat[stat.rfind(b")") + 2:].split()
+        cpu_ticks = int(fields[11]) + int(fields[12])
+        threads = int(fields[17])
+        rss = int(statm.split()[1]) * self.page_size
+        return cpu_ticks, rss, threads
+
+    def sample(self):
+        """Take a sample of every tracked app"""
+        with self.lock:
+            paths = list(self.histories.keys())
+        if not paths:
+            return
+
+        index = ProcessSnapshot.get_shared_snapshot().get_cwd_index()
+        now = time.monotonic()
+        for path, pids in index.get_pids_by_paths(paths).items():
+            cpu_ticks = rss = threads = 0
+            for pid in pids:
+                usage = self.read_usage(pid)
+                if usage:
+                    cpu_ticks += usage[0]
+                    rss += usage[1]
+                    threads += usage[2]
+
+            with self.lock:
+                history = self.histories.get(path)
+                if history:
+                    history.add_sample(now, cpu_ticks, rss, threads, self.clock_ticks)
+
+    def get_history(self, path: str) -> dict:
+        """Get the samples of an app, None if it's not tracked"""
+        with self.lock:
+            history = self.histories.get(path)
+            return history.to_dict() if history else None
+
+    def get_summary(self, path: str) -> dict:
+        """Get the summary of an app, None if it's not tracked"""
+        with self.lock:
+            history = self.histories.get(path)
+            return history.get_summary() if history else None
+
+    def get_summaries(self) -> dict:
+        """Get the summary of every tracked app, as a dictionary path -> summary"""
+        with self.lock:
+            return {path: history.get_summary() for path, history in self.histories.items()}
@@ -0,0 +1,59 @@
+"""Background thread waiting on a selector
+
+Base of the watchers that wait for many file descriptors at once(see
+ExitWatcher). The thread is started the first time a file
+descriptor is added, and a wakeup pipe lets other threads interrupt the wait
+when they add one or the timeout changes.
+"""
+import os
+import selectors
+import threading
+
+
+class SelectorThread:
+    def __init__(self):
+        """Selector with a wakeup pipe, subclasses implement on_event()"""
+        self.selector = selectors.DefaultSelector()
+        self.thread = None
+
+        # Used to wake up the selector when something changes
+        self.wakeup_read, self.wakeup_write = os.pipe()
+        os.set_blocking(self.wakeup_read, False)
+        self.selector.register(self.wakeup_read, selectors.EVENT_READ)
+
+    def start_thread(self):
+        """Start the background thread if it's not running, it must be called holding the
+        lock of the subclass"""
+        if not self.thread:
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+
+    def wakeup(self):
+        """Interrupt the wait, so the new file descriptors or timeout are used"""
+        os.write(self.wakeup_write, b"\0")
+
+    def get_timeout(self):
+        """Seconds to wait for events, None waits until there's one"""
+        return None
+
+    def on_event(self, key: selectors.SelectorKey):
+        """Called with every file descriptor that's ready"""
+        raise NotImplementedError
+
+    def after_select(self):
+        """Called after every wait, with or without events"""
+        pass
+
+    def run(self):
+        """Background thread"""
+        while True:
+            for key, _ in self.selector.select(self.get_timeout()):
+                if key.fd == self.wakeup_read:
+                    try:
+                        while os.read(self.wakeup_read, 512):
+                            pass
+                    except BlockingIOError:
+                        pass
+                    continue
+                self.on_event(key)
+            self.after_select()
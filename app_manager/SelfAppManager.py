@@ -4,6 +4,7 @@ import subprocess
 from ..data_configuration import LocalData
 from ..app_manager import AppManager
 from .. import os_stuff
+from .. import OStuff
 
 
 class SelfAppManager:
@@ -30,17 +31,17 @@ class SelfAppManager:
         if not self.start_cmd:
             raise Exception("Start cmd command not defined.")
 
-        parsed_cmds = bytes(self.start_cmd, 'utf8')
         if self.debug:
-            print("Parsed cmds: ", parsed_cmds)
+            print("Start cmd: ", self.start_cmd)
 
+        # Simple commands are executed directly, the rest by a single shell
         # For subprocess.Popen()
         # It's recommended to use fully qualified paths, or
         # some things might be overriden
-        process: subprocess.Popen = subprocess.Popen(["/bin/sh"],
-                                                     stdin=subprocess.PIPE,
-                                                     stdout=subprocess.PIPE,
-                                                     shell=True)
+        process: subprocess.Popen = OStuff.popen_command(
+            self.start_cmd,
+            "/bin/sh",
+            stdout=subprocess.PIPE)
         LocalData.save_data(
             {
                 "subprocesses": {
@@ -49,7 +50,7 @@ class SelfAppManager:
             },
             True)
 
-        out, err = process.communicate(parsed_cmds)
+        out, err = process.communicate()
         if self.debug:
             print("Communicated with subprocess")
         print(out.decode("utf-8"))
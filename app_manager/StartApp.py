@@ -1,17 +1,34 @@
 """Starts an app by the given path
 
 The app will remain running in the background even after the
-program is finished"""
+program is finished.
+
+If the app declares readiness checks(see Readiness), it has started when they
+pass, otherwise when it's still running after a second. If the checks don't
+pass, what was started is stopped, so trying again doesn't start a second copy.
+
+The output of the app is written to its log file(see AppLogs).
+
+If new_session is True, the app is started on its own process group, which is
+saved so the app can be stopped at once(see ProcessGroups)."""
+import signal
 import subprocess
 
+from .. import OStuff
+from . import AppLogs
+from . import ProcessGroups
+from . import Readiness
+
 
 class StartApp:
-    def __init__(self, path: str, project_info, debug: bool = False):
+    def __init__(self, path: str, project_info, new_session: bool = True, debug: bool = False):
         self.path: str = path
         self.project_info = project_info
+        self.new_session: bool = new_session
         self.debug: bool = debug
 
         self.start_commands = self.get_start_commands()
+        self.readiness = self.project_info.get_readiness()
         if self.debug:
             print("Start commands: ", self.start_commands)
 
@@ -32,6 +49,38 @@ class StartApp:
                 start_commands.append(commands[cmd_name])
         return start_commands
 
+    def popen(self, cmd: str) -> subprocess.Popen:
+        """Start the command, on a new process group if new_session is True
+
+        The output goes straight to the log file, a pipe would break once this
+        program ends"""
+        with AppLogs.open_app_log(self.path) as log:
+            process = subprocess.Popen(["/bin/bash", "-c", cmd],
+                                       stdout=log,
+                                       stderr=subprocess.STDOUT,
+                                       start_new_session=self.new_session)
+        if self.new_session:
+            # The first process of a new session is the group leader
+            ProcessGroups.save_pgid(self.path, process.pid)
+        return process
+
+    def stop(self, process: subprocess.Popen, timeout: float = 5.0):
+        """Stop a start command that didn't get ready, with its process group if it has one"""
+        if self.new_session:
+            OStuff.send_signal(process.pid, signal.SIGTERM, group=True, debug=self.debug)
+        elif process.poll() is None:
+            process.terminate()
+        try:
+            process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            if self.new_session:
+                OStuff.send_signal(process.pid, signal.SIGKILL, group=True, debug=self.debug)
+            else:
+                process.kill()
+            process.wait()
+        if self.new_session:
+            ProcessGroups.remove_pgid(self.path)
+
     def start_app(self):
         """Starts an app at the given path"""
         for start_com in self.start_commands:
@@ -44,15 +93,33 @@ class StartApp:
                 {start_com} &&
                 pwd;"""
 
+            if self.readiness:
+                # The checks are created before starting, so log checks only
+                # search the new lines
+                checks = Readiness.create_checks(self.path, self.readiness)
+
+                process = self.popen(cmd)
+
+                if Readiness.wait_until_ready(
+                        process,
+                        checks,
+                        Readiness.get_timeout(self.readiness),
+                        debug=self.debug):
+                    return 0
+                still_running = process.poll() is None
+                self.stop(process)
+                # Try the next command only if this one failed
+                if still_running:
+                    return 1
+                continue
+
             # Reference:
-            # https://docs.python.org/3/library/subprocess.html#subprocess.Popen.communicate
-            process = subprocess.Popen(["/bin/bash", "-c", cmd],
-                                  stdout=subprocess.PIPE,
-                                  stderr=subprocess.PIPE)
+            # https://docs.python.org/3/library/subprocess.html#subprocess.Popen.wait
+            process = self.popen(cmd)
             try:
                 # This is to separate the process, it will only work
                 # if the process keeps running after the timeout.
-                stdout, stderr = process.communicate(timeout=1)
+                process.wait(timeout=1)
             except subprocess.TimeoutExpired:
                 # Successfully started and now it's a standalone process
                 return 0
@@ -0,0 +1,359 @@
+"""Supervisor
+
+Long-running manager for many apps at once, the apps are started with
+asyncio.create_subprocess_exec on an event loop that runs on its own thread,
+instead of creating a new thread per operation.
+
+Every app has a state:
+    stopped -> starting -> running -> stopping -> stopped
+                    |          |
+                    +-> crashed <-+
+Apps that exit with an error are crashed and restarted with exponential
+backoff, apps that exit successfully are stopped(like AppManager.start_app, a
+start command may exit once it started the app in the background).
+
+The output of every app is drained on the loop into its log file(see AppLogs).
+
+Operations can be awaited from the supervisor loop(async_* methods) or called
+from any thread, in which case a concurrent.futures.Future is returned.
+
+Only for linux.
+"""
+import asyncio
+import os
+import signal
+import threading
+import time
+
+from ..data_configuration.ProjectInfo import ProjectInfo
+from .. import OStuff
+from . import AppLogs
+from . import ProcessGroups
+
+STOPPED = "stopped"
+STARTING = "starting"
+RUNNING = "running"
+STOPPING = "stopping"
+CRASHED = "crashed"
+
+# Shared by the whole program
+shared_supervisor = None
+shared_supervisor_lock = threading.Lock()
+
+
+def get_shared_supervisor(**kwargs):
+    """Get the supervisor shared by the whole program
+
+    The arguments are only used when it's created"""
+    global shared_supervisor
+    with shared_supervisor_lock:
+        if not shared_supervisor:
+            shared_supervisor = Supervisor(**kwargs)
+    return shared_supervisor
+
+
+class SupervisedApp:
+    def __init__(self, path: str):
+        """State of an app managed by the supervisor"""
+        self.path = path
+        self.state = STOPPED
+        self.process = None
+        self.started_at = None
+        # Consecutive crashes, used for the backoff
+        self.crashes = 0
+        self.restarts = 0
+        self.stop_requested = False
+        self.monitor_task = None
+        # Output of every run of the app
+        self.log = None
+
+    def to_dict(self) -> dict:
+        """Get the app state, it's json serializable"""
+        return {
+            "path": self.path,
+            "state": self.state,
+            "pid": self.process.pid if self.process else None,
+            "restarts": self.restarts,
+            "crashes": self.crashes,
+        }
+
+
+class Supervisor:
+    def __init__(
+            self,
+            repositories_path: str = "",
+            max_concurrency: int = 8,
+            startup_time: float = 1.0,
+            restart_on_crash: bool = True,
+            initial_backoff: float = 1.0,
+            max_backoff: float = 60.0,
+            stop_timeout: float = 10.0,
+            read_size: int = 65536,
+            debug: bool = False):
+        """Supervisor
+
+        At most max_concurrency apps are started or stopped at the same time,
+        an app has started if it's still running after startup_time seconds or it
+        exited successfully, it has crashed if it exits with an error."""
+        self.repositories_path = repositories_path
+        self.max_concurrency = max_concurrency
+        self.startup_time = startup_time
+        self.restart_on_crash = restart_on_crash
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.stop_timeout = stop_timeout
+        self.read_size = read_size
+        self.debug = debug
+
+        # App path -> SupervisedApp
+        self.apps: dict = {}
+        self.loop = None
+        self.thread = None
+        self.semaphore = None
+        self.lock = threading.Lock()
+
+    ############
+    ### Loop ###
+    ############
+    def get_loop(self) -> asyncio.AbstractEventLoop:
+        """Get the supervisor event loop, it's started on its own thread if it isn't running"""
+        with self.lock:
+            if not self.loop:
+                self.loop = asyncio.new_event_loop()
+                self.thread = threading.Thread(target=self.run_loop, daemon=True)
+                self.thread.start()
+        return self.loop
+
+    def run_loop(self):
+        """Supervisor thread"""
+        asyncio.set_event_loop(self.loop)
+        self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.loop.run_forever()
+
+    def submit(self, coroutine):
+        """Run a coroutine on the supervisor loop, returns a concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.get_loop())
+
+    def get_app(self, path: str) -> SupervisedApp:
+        """Get the supervised app at the given path"""
+        with self.lock:
+            if path not in self.apps:
+                self.apps[path] = SupervisedApp(path)
+            return self.apps[path]
+
+    def get_state(self, path: str) -> str:
+        """Get the state of an app"""
+        return self.get_app(path).state
+
+    def get_states(self) -> dict:
+        """Get the state of every app, as a dictionary path -> app state"""
+        with self.lock:
+            return {path: app.to_dict() for path, app in self.apps.items()}
+
+    def get_app_paths(self) -> list:
+        """Get the path of every devtools compatible app in the repositories path"""
+        from ..local_repository_manager import LocalRepositoryManager
+
+        manager = LocalRepositoryManager(self.repositories_path, debug=self.debug)
+        return [repository["path"] for repository in manager.get_all_repos_info()
+                if repository["dev_tools"]]
+
+    ############################
+    ### Sync API(any thread) ###
+    ############################
+    def start_app(self, path: str):
+        """Start an app, returns a Future with True if it started"""
+        return self.submit(self.async_start_app(path))
+
+    def stop_app(self, path: str):
+        """Stop an app, returns a Future with True if it stopped"""
+        return self.submit(self.async_stop_app(path))
+
+    def restart_app(self, path: str):
+        """Restart an app, returns a Future with True if it started again"""
+        return self.submit(self.async_restart_app(path))
+
+    def start_all(self, paths: list = None):
+        """Start every app, if no paths are given, every devtools app in the repositories path
+
+        Returns a Future with a dictionary path -> started"""
+        if paths is None:
+            paths = self.get_app_paths()
+        return self.submit(self.async_start_all(paths))
+
+    def stop_all(self):
+        """Stop every app, returns a Future with a dictionary path -> stopped"""
+        with self.lock:
+            paths = list(self.apps.keys())
+        return self.submit(self.async_stop_all(paths))
+
+    def shutdown(self, timeout: float = None):
+        """Stop every app and the supervisor loop"""
+        if not self.loop:
+            return
+        self.submit(self.async_shutdown()).result(timeout)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout)
+
+    #################
+    ### Async API ###
+    #################
+    async def async_start_all(self, paths: list) -> dict:
+        """Start many apps, at most max_concurrency at the same time"""
+        results = await asyncio.gather(*[self.async_start_app(path) for path in paths])
+        return dict(zip(paths, results))
+
+    async def async_stop_all(self, paths: list) -> dict:
+        """Stop many apps, at most max_concurrency at the same time"""
+        results = await asyncio.gather(*[self.async_stop_app(path) for path in paths])
+        return dict(zip(paths, results))
+
+    async def async_shutdown(self):
+        """Stop every app and its monitor"""
+        with self.lock:
+            apps = list(self.apps.values())
+        await self.async_stop_all([app.path for app in apps])
+        for app in apps:
+            if app.monitor_task and not app.monitor_task.done():
+                app.monitor_task.cancel()
+
+    async def async_start_app(self, path: str) -> bool:
+        """Start an app"""
+        app = self.get_app(path)
+        if app.state in (STARTING, RUNNING):
+            return True
+
+        async with self.semaphore:
+            # It may have been started(or restarted by its monitor) while waiting
+            if app.state in (STARTING, RUNNING):
+                return True
+            return await self.spawn(app)
+
+    async def spawn(self, app: SupervisedApp) -> bool:
+        """Start the app process and wait until it's considered running"""
+        try:
+            start_command = ProjectInfo(app.path, debug=self.debug).get_start_command()
+        except Exception as ex:
+            print("Supervisor -> spawn(): Exception: ", ex)
+            app.state = CRASHED
+            return False
+        if not start_command:
+            print(f"Supervisor -> spawn(): The app at {app.path} doesn't have a start command.")
+            app.state = CRASHED
+            return False
+
+        app.state = STARTING
+        app.stop_requested = False
+        # New session, so the whole process tree can be stopped at once
+        app.process = await asyncio.create_subprocess_exec(
+            "/bin/bash", "-c", start_command,
+            cwd=app.path,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            start_new_session=True)
+        app.started_at = time.monotonic()
+        # So it can be stopped from other programs too
+        ProcessGroups.save_pgid(app.path, app.process.pid)
+        if not app.log:
+            app.log = AppLogs.RotatingLog(AppLogs.get_log_path(app.path))
+        for stream in (app.process.stdout, app.process.stderr):
+            asyncio.ensure_future(self.drain(stream, app.log))
+        if self.debug:
+            print(f"Supervisor -> spawn(): {app.path} started with pid {app.process.pid}")
+
+        try:
+            returncode = await asyncio.wait_for(
+                asyncio.shield(app.process.wait()), self.startup_time)
+            # It exited before the startup time, the monitor restarts it if it crashed
+            started = returncode == 0
+            app.state = STOPPED if started else CRASHED
+        except asyncio.TimeoutError:
+            started = True
+            app.state = RUNNING
+        app.monitor_task = asyncio.ensure_future(self.monitor(app))
+        return started
+
+    async def drain(self, stream: asyncio.StreamReader, log: AppLogs.RotatingLog):
+        """Write the output of the app to its log as it arrives, until the pipe is closed"""
+        while True:
+            data = await stream.read(self.read_size)
+            if not data:
+                break
+            log.write(data)
+
+    async def monitor(self, app: SupervisedApp):
+        """Wait until the app exits and restart it if it crashed"""
+        process = app.process
+        returncode = await process.wait()
+        if app.stop_requested or app.process is not process:
+            return
+
+        if returncode == 0:
+            # It finished successfully, it's not a crash
+            app.state = STOPPED
+            app.crashes = 0
+            if self.debug:
+                print(f"Supervisor -> monitor(): {app.path} finished")
+            return
+
+        app.state = CRASHED
+        # Forget its group, a new one is saved when it's restarted
+        ProcessGroups.remove_pgid(app.path)
+        # If it ran for a while, it's not crashing in a loop
+        if time.monotonic() - app.started_at > self.max_backoff:
+            app.crashes = 0
+        app.crashes += 1
+        if self.debug:
+            print(f"Supervisor -> monitor(): {app.path} exited with {returncode}")
+
+        if not self.restart_on_crash:
+            return
+
+        backoff = min(self.initial_backoff * 2 ** (app.crashes - 1), self.max_backoff)
+        await asyncio.sleep(backoff)
+        if app.stop_requested or app.state != CRASHED:
+            return
+
+        async with self.semaphore:
+            # It may have been started or stopped while waiting
+            if app.stop_requested or app.state != CRASHED:
+                return
+            app.restarts += 1
+            await self.spawn(app)
+
+    async def async_stop_app(self, path: str) -> bool:
+        """Stop an app, the term signal is sent to its whole process group and
+        if it's still running after stop_timeout, the kill signal"""
+        app = self.get_app(path)
+        app.stop_requested = True
+        process = app.process
+        if not process or process.returncode is not None:
+            # The group may outlive its leader(e.g. a start command that runs a daemon)
+            pgid = ProcessGroups.get_pgid(path, fresh=True)
+            if pgid is not None:
+                OStuff.send_signal(pgid, signal.SIGTERM, group=True)
+            ProcessGroups.remove_pgid(path)
+            app.state = STOPPED
+            return True
+
+        async with self.semaphore:
+            app.state = STOPPING
+            try:
+                os.killpg(process.pid, signal.SIGTERM)
+                try:
+                    await asyncio.wait_for(process.wait(), self.stop_timeout)
+                except asyncio.TimeoutError:
+                    os.killpg(process.pid, signal.SIGKILL)
+                    await process.wait()
+            except ProcessLookupError:
+                pass
+            ProcessGroups.remove_pgid(path)
+
+        app.state = STOPPED
+        return True
+
+    async def async_restart_app(self, path: str) -> bool:
+        """Restart an app"""
+        await self.async_stop_app(path)
+        return await self.async_start_app(path)
@@ -5,33 +5,196 @@ only for linux
 
 
 """
+import copy
 import os
 import subprocess
-from threading import Thread
+import time
+from threading import Lock
 
 from ... import py_proces_utils as process_utils
 
+from ..data_configuration import DBPath
 from ..data_configuration.ProjectInfo import ProjectInfo
-from ..dbs.RepositorySettings import RepositorySettings
+from ..dbs.RepositorySettings import RepositorySettings, get_generation as get_settings_generation
 from .. import Debug
+from .. import Instrumentation
 from .. import OStuff
 
 from .StartApp import StartApp
 from .ProcessInfo import ProcessInfo
+from . import AppLogs
+from . import Executor
+from . import ExitWatcher
+from . import ProcScanner
+from . import ProcessGroups
+from . import ProcessSnapshot
+from . import ResourceSampler
+
+
+# (App path, threaded, new_session, debug) -> (AppManager, registry key), see AppManager.for_path
+registry: dict = {}
+registry_lock = Lock()
+# If the registry is subscribed to the ConfigWatcher, see subscribe_registry()
+registry_subscribed = False
+
+
+def get_db_version() -> tuple:
+    """Get the modification time of the database and its write-ahead log
+
+    They change when any process updates a row, not only this one"""
+    db_path = DBPath.get_full_db_path()
+    version = []
+    for path in (db_path, f"{db_path}-wal"):
+        try:
+            version.append(os.stat(path).st_mtime_ns)
+        except OSError:
+            version.append(None)
+    return tuple(version)
+
+
+def get_registry_key(path: str) -> tuple:
+    """Get what the cached AppManager of an app depends on
+
+    The settings.json modification time, the database version(changed by any process)
+    and the repository settings generation(changed by this process).
+    The database version is the modification time of the whole database, sqlite doesn't
+    tell which table changed, so any write to any table(e.g. another process updating
+    its own settings) discards every cached AppManager, they are created again when
+    they're used."""
+    try:
+        mtime = os.stat(f"{path}{os.path.sep}settings.json").st_mtime_ns
+    except OSError:
+        mtime = None
+    return mtime, get_db_version(), get_settings_generation()
+
+
+def invalidate_app_managers(path: str = None):
+    """Discard the cached AppManager of an app, or every one if no path is given"""
+    with registry_lock:
+        if path is None:
+            registry.clear()
+            return
+        for entry_key in [entry_key for entry_key in registry if entry_key[0] == path]:
+            del registry[entry_key]
+
+
+def on_config_change(path: str):
+    """Discard the cached AppManager of the app whose files changed, see ConfigWatcher"""
+    if path is None:
+        invalidate_app_managers()
+        return
+    with registry_lock:
+        paths = {app_path for app_path, *_ in registry
+                 if path == app_path or path.startswith(f"{app_path}{os.path.sep}")}
+    for app_path in paths:
+        invalidate_app_managers(app_path)
+
+
+def subscribe_registry():
+    """Receive the changes of the ConfigWatcher, it's only imported when it's needed"""
+    global registry_subscribed
+    if registry_subscribed:
+        return
+    from ..data_configuration import ConfigWatcher
+    ConfigWatcher.subscribe(on_config_change)
+    registry_subscribed = True
+
+
+def get_apps_pids(paths: list, fresh: bool = False) -> dict:
+    """Get the pids running under each app path or its subfolders
+
+    Every path is answered with the same scan of the process table,
+    returns a dictionary path -> pids"""
+    index = ProcessSnapshot.get_shared_snapshot().get_cwd_index(fresh)
+    return index.get_pids_by_paths(paths)
+
+
+def get_running_apps(paths: list, fresh: bool = False) -> dict:
+    """Check which apps are running, returns a dictionary path -> bool"""
+    if not ProcScanner.is_available():
+        return {path: process_utils.check_is_app_running_by_cwd(path) for path in paths}
+
+    index = ProcessSnapshot.get_shared_snapshot().get_cwd_index(fresh)
+    return {path: index.is_running(path) for path in paths}
+
+
+def stop_many(paths: list, grace: float = 10.0, debug: bool = False) -> dict:
+    """Stop many apps at the same time
+
+    The term signal is sent to every process of every app at once, then all of them are
+    waited together, the ones still running after the grace period get the kill signal.
+
+    Returns a report per app path:
+    pids: every process found, terminated: the ones that exited after the term signal,
+    killed: the ones that needed the kill signal, running: the ones that didn't exit even
+    after that, seconds: how long it took until the last process of the app exited"""
+    if debug:
+        print("\napp_manager -> stop_many():")
+
+    start = time.monotonic()
+    watcher = ExitWatcher.get_shared_watcher()
+    apps_pids = get_apps_pids(paths, fresh=True)
+
+    # Watch first, so no exit is missed
+    watched = {}
+    for pids in apps_pids.values():
+        for pid in pids:
+            if pid != os.getpid() and pid not in watched:
+                watched[pid] = watcher.watch(pid)
+
+    for pid in watched:
+        OStuff.send_signal(pid, 15)
+
+    deadline = start + grace
+    for process in watched.values():
+        process.exited.wait(max(deadline - time.monotonic(), 0))
+
+    killed = set()
+    for pid, process in watched.items():
+        if not process.exited.is_set() and OStuff.send_signal(pid, 9):
+            killed.add(pid)
+    # The kill signal can't be ignored, it shouldn't take long
+    for pid in killed:
+        watched[pid].exited.wait(1)
+
+    report = {}
+    for path, pids in apps_pids.items():
+        processes = [watched[pid] for pid in pids if pid in watched]
+        exit_times = [process.exit_time for process in processes if process.exit_time]
+        report[path] = {
+            "pids": [process.pid for process in processes],
+            "terminated": [process.pid for process in processes
+                           if process.exited.is_set() and process.pid not in killed],
+            "killed": [process.pid for process in processes if process.pid in killed],
+            "running": [process.pid for process in processes if not process.exited.is_set()],
+            "seconds": max(exit_times) - start if exit_times else 0.0,
+        }
+        if debug:
+            print(f"{path}: ", report[path])
+
+    return report
 
 
 class AppManager:
     """App manager
 
     Manages execution, stop, restarting and setup of a given app
+
+    If new_session is True, the app is started on its own process group, so it
+    can be stopped with a single signal to the group
+
+    If threaded is True, the operations run on a shared bounded thread pool(see Executor)
+    and return a concurrent.futures.Future with their result or exception
     """
     def __init__(
             self,
             path: str,
             threaded: bool = True,
+            new_session: bool = True,
             debug: bool = False):
         self.path: str = path
         self.threaded = threaded
+        self.new_session = new_session
         self.debug: bool = debug
 
         self.app_name: str = path.split(os.path.sep)[-1]
@@ -44,58 +207,194 @@ class AppManager:
 
         self.project_info = ProjectInfo(self.path, debug=debug)
 
+    @classmethod
+    def for_path(
+            cls,
+            path: str,
+            threaded: bool = True,
+            new_session: bool = True,
+            debug: bool = False):
+        """Get the shared AppManager of the app at the given path, with the given options
+
+        It's created once and reused until the settings.json of the app or the
+        repository settings change, also if another process changes the database"""
+        subscribe_registry()
+        entry_key = (path, threaded, new_session, debug)
+        with registry_lock:
+            entry = registry.get(entry_key)
+        if entry and entry[1] == get_registry_key(path):
+            return entry[0]
+
+        app = cls(path, threaded=threaded, new_session=new_session, debug=debug)
+        # Computed after creating it, creating it may create or update the database
+        key = get_registry_key(path)
+        with registry_lock:
+            registry[entry_key] = (app, key)
+        return app
+
     def send_term_signal(self, pid: int):
         """Send term signal by pid"""
         if self.debug:
             print("\nAppManager -> send_term_signal():")
-        # Start a new process to shut down the previous process
-        # For this we will send a sigterm, which was captured before
-        raw_cmds = f"""
-        kill -s 15 {pid}
-        """
-        parsed_cmds = bytes(raw_cmds, 'utf8')
-
-        # For subprocess.Popen()
-        # It's recommended to use fully qualified paths, or
-        # some things might be overriden
-        process: subprocess.Popen = subprocess.Popen(["/bin/sh"],
-                                                     stdin=subprocess.PIPE,
-                                                     stdout=subprocess.PIPE,
-                                                     shell=True)
-        out, err = process.communicate(parsed_cmds)
-
-    def is_app_running(self):
+        # Send the sigterm directly, which was captured before
+        OStuff.send_signal(pid, 15, debug=self.debug)
+
+    def is_app_running(self, fresh: bool = False):
         """Check if the app is running"""
         if self.debug:
             print("\nAppManager -> is_app_running():")
-        return process_utils.check_is_app_running_by_cwd(self.path)
+        with Instrumentation.span("AppManager.is_app_running", self.path):
+            return get_running_apps([self.path], fresh)[self.path]
+
+    def watch_pid(self, pid: int, callback=None):
+        """Get notified when a process of this app exits
+
+        The callback is called with the pid from the watcher thread"""
+        return ExitWatcher.get_shared_watcher().watch(pid, callback, key=self.path)
+
+    def adopt(self) -> list:
+        """Watch every process already running in the app folder or its subfolders
+
+        Returns the adopted pids"""
+        if not ProcScanner.is_available():
+            return []
+
+        pids = [pid for pid in get_apps_pids([self.path], fresh=True)[self.path]
+                if pid != os.getpid()]
+        for pid in pids:
+            self.watch_pid(pid)
+        if pids:
+            ResourceSampler.get_shared_sampler().track(self.path)
+            self.adopt_process_group()
+        return pids
+
+    def adopt_process_group(self):
+        """Save the process group of the app if it's already running on its own group
+
+        Returns the pgid, None if it isn't"""
+        if not ProcScanner.is_available():
+            return None
+        return ProcessGroups.adopt(self.path)
+
+    def get_pgid(self):
+        """Get the process group of the app, None if it's not running on its own group"""
+        if not ProcScanner.is_available():
+            return None
+        return ProcessGroups.get_pgid(self.path, fresh=True)
+
+    def get_watched_pids(self) -> list:
+        """Get the watched pids of this app that are still running"""
+        return ExitWatcher.get_shared_watcher().get_pids(self.path)
+
+    def get_resource_history(self) -> dict:
+        """Get the cpu, rss and threads samples of this app
+
+        Starts sampling the app if it wasn't sampled yet"""
+        sampler = ResourceSampler.get_shared_sampler()
+        sampler.track(self.path)
+        return sampler.get_history(self.path)
+
+    def get_resource_summary(self) -> dict:
+        """Get the p50, p95 and max of the resources used by this app
+
+        It's json serializable"""
+        sampler = ResourceSampler.get_shared_sampler()
+        sampler.track(self.path)
+        return sampler.get_summary(self.path)
+
+    def wait_for_exit(self, timeout: float = None) -> bool:
+        """Wait until every watched process of this app exits
+
+        Returns False if some process is still running after the timeout"""
+        if self.debug:
+            print("\nAppManager -> wait_for_exit():")
+        watcher = ExitWatcher.get_shared_watcher()
+        return watcher.wait_for_exit(watcher.get_pids(self.path), timeout)
+
+    def tail(self, n: int = 10) -> list:
+        """Get the last n lines of the output of this app"""
+        return AppLogs.tail(self.path, n)
+
+    def run_operation(self, fn):
+        """Run an operation, on the shared thread pool if it's threaded
+
+        Returns a concurrent.futures.Future if it's threaded, otherwise the result"""
+        if self.threaded:
+            return Executor.submit(fn)
+        return fn()
+
+    def kill_all_by_cwd_and_subfolders(self, fresh: bool = True):
+        """Send the term signal to every process running in the app folder or its subfolders
+
+        If fresh is False, the last scan of the process table is used if it's not stale"""
+        if not ProcScanner.is_available():
+            process_utils.kill_all_by_cwd_and_subfolders(self.path)
+            return
+
+        for pid in get_apps_pids([self.path], fresh=fresh)[self.path]:
+            # Don't kill ourselves
+            if pid == os.getpid():
+                continue
+            try:
+                os.kill(pid, 15)
+            except ProcessLookupError:
+                pass
 
 
     ##################
     ### Operations ###
     ##################
-    def start_app(self):
-        """Starts the application in the background"""
+    def start_app(self, startup_time: float = 1.0):
+        """Starts the application in the background
+
+        The output of the app goes to its log(see AppLogs), it has started if it's still
+        running after startup_time seconds or it exited successfully.
+        Raises an exception if it exited with an error"""
         if self.debug:
             print("\nAppManager -> start_app():")
 
+        ResourceSampler.get_shared_sampler().track(self.path)
+
+        def on_start(process):
+            self.watch_pid(process.pid)
+            if self.new_session:
+                # The first process of a new session is the group leader
+                ProcessGroups.save_pgid(self.path, process.pid)
+
+        @Instrumentation.timed("AppManager.start_app", lambda: self.path)
         def start_app():
             # The app will be executed on creation
-            # StartApp(self.path, self.project_info, debug=self.debug)
+            # StartApp(self.path, self.project_info, new_session=self.new_session, debug=self.debug)
             start_command = self.project_info.get_start_command()
             if not start_command:
                 raise Exception("The app doesn't have a start command.")
-            else:
-                out, err = OStuff.run_commands(start_command)
 
-        if self.threaded:
-            thread = Thread(target=start_app)
-            thread.start()
-        else:
-            start_app()
-
-    def stop_app(self):
-        """Stops the application in the background"""
+            # The output goes straight to the log file, a pipe would break once
+            # this program ends
+            with AppLogs.open_app_log(self.path) as log:
+                process: subprocess.Popen = OStuff.popen_command(
+                    start_command,
+                    cwd=self.path,
+                    stdin=subprocess.DEVNULL,
+                    stdout=log,
+                    stderr=subprocess.STDOUT,
+                    start_new_session=self.new_session)
+            on_start(process)
+            try:
+                returncode = process.wait(startup_time)
+            except subprocess.TimeoutExpired:
+                return True
+            if returncode:
+                raise Exception(f"The app at {self.path} exited with code {returncode}.")
+            return True
+
+        return self.run_operation(start_app)
+
+    def stop_app(self, timeout: float = None):
+        """Stops the application in the background
+
+        If a timeout is given, it waits until the processes of the app exit, and the
+        result is False if some process was still running after the timeout"""
         if self.debug:
             print("\nAppManager -> stop_app():")
 
@@ -107,44 +406,68 @@ class AppManager:
 
                 # Check if the app has a stop command
                 if "stop" in commands:
-                    # Run stop command
-                    parsed_cmds = bytes(commands["stop"], 'utf8')
+                    # Run stop command, without a shell if it's a simple command
                     if self.debug:
-                        print("Stop command: ", parsed_cmds)
-                    stop_process: subprocess.Popen = subprocess.Popen(["/bin/sh"],
-                                                                 stdin=subprocess.PIPE,
-                                                                 stdout=subprocess.PIPE,
-                                                                 shell=True)
-                    out, err = stop_process.communicate(parsed_cmds)
+                        print("Stop command: ", commands["stop"])
+                    stop_process: subprocess.Popen = OStuff.popen_command(
+                        commands["stop"],
+                        "/bin/sh",
+                        stdout=subprocess.PIPE)
+                    out, err = stop_process.communicate()
                     if self.debug:
                         print(out)
                     # App terminated go back
                     return
 
+            # Started on its own process group, stop the whole tree at once
+            checked_at = time.monotonic()
+            pgid = self.get_pgid()
+            if pgid is not None:
+                if self.debug:
+                    print("Process group found: ", pgid)
+                if timeout is not None:
+                    for pid in ProcessGroups.get_group_pids(pgid):
+                        self.watch_pid(pid)
+                OStuff.send_signal(pgid, 15, group=True, debug=self.debug)
+                ProcessGroups.remove_pgid(self.path)
+                return
+
             # Some DevTools apps might store the pid
             if "pid" in self.project_info.info:
                 pid = self.project_info.info["pid"]
                 if self.debug:
                     print("Pid found: ", pid)
                     print("Killing process.")
-                os.kill(pid, 15)
+                if timeout is not None:
+                    self.watch_pid(pid)
+                OStuff.send_signal(pid, 15)
                 return
 
             # If the app has no stop command, no pid file, we need to do it the hard way.
-            # Search for the app and terminate it(with signal 15)
-            process_utils.kill_all_by_cwd_and_subfolders(self.path)
-        if self.threaded:
-            # I don't think this is necessary, but just in case
-            def run_fn():
-                stop_app()
-
-            thread = Thread(target=run_fn)
-            thread.start()
-        else:
+            # Search for the app and terminate it(with signal 15), the process table
+            # is only scanned again if get_pgid() didn't scan it
+            scanned = ProcessSnapshot.get_shared_snapshot().is_refreshed_since(checked_at)
+            self.kill_all_by_cwd_and_subfolders(fresh=not scanned)
+
+        @Instrumentation.timed("AppManager.stop_app", lambda: self.path)
+        def stop_and_wait():
+            if timeout is not None:
+                # Processes started by someone else, adopted by the worker because it
+                # scans the process table
+                self.adopt()
             stop_app()
+            if timeout is not None:
+                return self.wait_for_exit(timeout)
+            return True
 
-    def restart_app(self):
-        """Restarts an app"""
+        return self.run_operation(stop_and_wait)
+
+    def restart_app(self, stop_timeout: float = 10.0):
+        """Restarts an app
+
+        It's started once every process of the app exited, so the new one doesn't find
+        its port or pid file still taken. Raises an exception if some process is still
+        running after stop_timeout seconds"""
         if self.debug:
             print("\nAppManager -> restart_app():")
 
@@ -152,37 +475,41 @@ class AppManager:
         should_debug_app_manager = Debug.should_debug_app_manager()
 
         # Restart the app after a git pull
+        @Instrumentation.timed("AppManager.restart_app", lambda: self.path)
         def app_management():
-            # Stop the process
-            app = AppManager(
-                f"{self.path}",
-                threaded=False,
-                # Check if the user gave an argument to debug this particular part
-                # of the program
-                debug=should_debug_app_manager
-                )
-            app.stop_app()
+            # Same app, but not threaded, the settings are already loaded
+            app = copy.copy(self)
+            app.threaded = False
+            # Check if the user gave an argument to debug this particular part
+            # of the program
+            app.debug = should_debug_app_manager
+
+            # Stop the process and wait until it exits
+            if not app.stop_app(timeout=stop_timeout):
+                raise Exception(f"The app at {self.path} is still running {stop_timeout} "
+                                f"seconds after stopping it.")
 
             # Start the app
-            app.start_app()
+            return app.start_app()
 
-        # Check if it's threaded and restart the app
-        if self.threaded:
-            thread = Thread(target=app_management)
-            thread.start()
-        else:
-            app_management()
+        return self.run_operation(app_management)
 
-    def run_command(self, command_name: str):
-        """Run a command on the given app"""
+    def run_command(self, command_name: str, tee_path: str = None):
+        """Run a command on the given app
+
+        The output is printed as it arrives, and also appended to tee_path if it's given.
+        The result is the exit code"""
         # Run a command
+        @Instrumentation.timed(f"AppManager.run_command.{command_name}", lambda: self.path)
         def app_management():
             commands = self.project_info.get_commands()
-            subprocess.run(["/bin/bash", "-c", f"'cd {self.path}; {commands[command_name]};'"])
-
-        # Check if it's threaded and run command
-        if self.threaded:
-            thread = Thread(target=app_management)
-            thread.start()
-        else:
-            app_management()
+            stream = OStuff.stream_commands(
+                commands[command_name],
+                cwd=self.path,
+                tee_path=tee_path,
+                debug=self.debug)
+            for line in stream:
+                print(line)
+            return stream.returncode
+
+        return self.run_operation(app_management)
@@ -0,0 +1,343 @@
+"""Benchmarks
+
+Rough measurements of the hot paths, every benchmark prints its results and
+returns them as a dictionary so they can be compared between versions.
+
+Use it from the parent project, e.g.:
+```python
+from dev_tools_utils import benchmarks
+
+benchmarks.benchmark_process_info("python")
+```
+"""
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+
+def get_fork_count() -> int:
+    """Get the number of processes created on the system since boot
+
+    It's system wide, so other programs may add some noise"""
+    with open("/proc/stat") as f:
+        for line in f:
+            if line.startswith("processes"):
+                return int(line.split()[1])
+    return 0
+
+
+def benchmark_process_info(
+        process_name: str = "python",
+        iterations: int = 10,
+        add_cwd: bool = True,
+        debug: bool = False):
+    """Compare the 'ps' engine of ProcessInfo against the /proc engine
+
+    Measures the wall time and the forks used by every query, the /proc engine is
+    measured reading everything, refreshing a snapshot incrementally and using
+    the cached snapshot."""
+    if debug:
+        print("\nbenchmarks -> benchmark_process_info():")
+
+    from ..app_manager.ProcessInfo import ProcessInfo
+    from ..app_manager.ProcScanner import ProcScanner
+    from ..app_manager.ProcessSnapshot import ProcessSnapshot
+
+    def full_scan():
+        return ProcScanner().get_processes_info_by_name(
+            process_name, process_info.format_specifiers, add_cwd)
+
+    def incremental_scan():
+        return process_info.get_processes_info_by_name(fresh=True)
+
+    def cached_scan():
+        return process_info.get_processes_info_by_name()
+
+    results = {}
+    for engine, query in [
+                ("ps", None),
+                ("proc", full_scan),
+                ("proc incremental", incremental_scan),
+                ("proc cached", cached_scan),
+            ]:
+        process_info = ProcessInfo(
+            process_name,
+            add_cwd=add_cwd,
+            engine="ps" if engine == "ps" else "proc",
+            snapshot=ProcessSnapshot(ttl=60))
+        if not query:
+            query = process_info.get_processes_info_by_name
+        # The first scan of a snapshot reads everything
+        query()
+
+        forks = get_fork_count()
+        start = time.perf_counter()
+        for _ in range(iterations):
+            processes = query()
+        elapsed = time.perf_counter() - start
+        forks = get_fork_count() - forks
+
+        results[engine] = {
+            "processes": len(processes),
+            "forks_per_query": forks / iterations,
+            "ms_per_query": elapsed * 1000 / iterations,
+        }
+        print(f"[{engine}] {len(processes)} processes, "
+              f"{forks / iterations:.1f} forks/query, "
+              f"{elapsed * 1000 / iterations:.2f} ms/query")
+
+    return results
+
+
+def parse_info_per_field(pinfo: str, format_names: list) -> dict:
+    """Previous ProcessInfo.parse_info(), splits the remaining line once per field
+
+    Kept here as the reference for benchmark_ps_parser()"""
+    result = {}
+    for i in range(len(format_names)):
+        if i == len(format_names) - 1:
+            result[format_names[i]] = pinfo
+            break
+        try:
+            format_value, remaining = pinfo.split(' ', maxsplit=1)
+            result[format_names[i]] = format_value
+        except ValueError:
+            break
+        pinfo = remaining.strip()
+    return result
+
+
+def get_synthetic_ps_output(lines: int = 10000) -> str:
+    """Get a 'ps -eo euser,pid,ppid,c,stime,tty,time,cmd' like output"""
+    rows = []
+    for pid in range(1, lines + 1):
+        rows.append(f"user{pid % 7:<4}{pid:>8}{pid // 3:>8}  0 12:06 pts/{pid % 4}"
+                    f"    00:00:{pid % 60:02d} /usr/bin/python3 -m app{pid} --port {8000 + pid}")
+    return "\n".join(rows) + "\n"
+
+
+def benchmark_ps_parser(lines: int = 10000, iterations: int = 5, debug: bool = False):
+    """Compare parsing a 'ps' output per field against splitting every line once"""
+    if debug:
+        print("\nbenchmarks -> benchmark_ps_parser():")
+
+    from ..app_manager import ProcessRecord
+    from ..app_manager.ProcessInfo import ProcessInfo
+
+    fields = "euser,pid,ppid,c,stime,tty,time,cmd".split(",")
+    process_data = get_synthetic_ps_output(lines)
+
+    def per_field():
+        return [parse_info_per_field(line, fields)
+                for line in process_data.split("\n") if line]
+
+    def records():
+        return ProcessRecord.parse_records(process_data, fields)
+
+    def dictionaries():
+        return ProcessInfo("", engine="ps").custom_process_data_to_dictionary_list(
+            process_data, fields)
+
+    def table():
+        return ProcessRecord.parse_table(process_data, fields)
+
+    results = {}
+    for name, parse in [
+                ("per field", per_field),
+                ("records", records),
+                ("dictionaries", dictionaries),
+                ("column arrays", table),
+            ]:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            parse()
+        elapsed = (time.perf_counter() - start) / iterations
+
+        results[name] = {
+            "ms": elapsed * 1000,
+            "lines_per_second": lines / elapsed,
+        }
+        print(f"[{name}] {elapsed * 1000:.2f} ms, {lines / elapsed:,.0f} lines/s")
+
+    return results
+
+
+def parse_import_time(output: str) -> list:
+    """Parse the output of 'python -X importtime'
+
+    Returns a list of (module, self microseconds, cumulative microseconds)"""
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        values = line[len("import time:"):].split("|")
+        # The header
+        if len(values) != 3 or not values[0].strip().isdigit():
+            continue
+        modules.append((values[2].strip(), int(values[0]), int(values[1])))
+    return modules
+
+
+def benchmark_import_time(module: str = None, runs: int = 5, top: int = 10, debug: bool = False):
+    """Measure how long it takes to import the package with 'python -X importtime'
+
+    Every run is a new interpreter, by default this package is imported. Prints the
+    median import time and the modules that took the longest on the median run."""
+    if debug:
+        print("\nbenchmarks -> benchmark_import_time():")
+
+    if not module:
+        module = __name__.rsplit(".", 1)[0]
+
+    # The same paths as this interpreter, so the package is found
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(path for path in sys.path if path)}
+    measures = []
+    for _ in range(runs):
+        process = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            env=env,
+            text=True)
+        if process.returncode:
+            raise Exception(f"Couldn't import {module}:\n{process.stderr}")
+
+        modules = parse_import_time(process.stderr)
+        total = sum(self_time for _, self_time, _ in modules)
+        measures.append((total, modules))
+
+    measures.sort(key=lambda measure: measure[0])
+    total, modules = measures[len(measures) // 2]
+    slowest = sorted(modules, key=lambda item: item[2], reverse=True)[:top]
+
+    results = {
+        "module": module,
+        "ms": total / 1000,
+        "min_ms": measures[0][0] / 1000,
+        "stdev_ms": statistics.pstdev(measure[0] for measure in measures) / 1000,
+        "modules": len(modules),
+        "slowest": [{"module": name, "self_ms": self_time / 1000, "cumulative_ms": cumulative / 1000}
+                    for name, self_time, cumulative in slowest],
+    }
+    print(f"[import {module}] {results['ms']:.2f} ms(median of {runs}), {len(modules)} modules")
+    for item in results["slowest"]:
+        print(f"    {item['cumulative_ms']:8.2f} ms {item['module']}")
+    return results
+
+
+def get_json_payloads() -> dict:
+    """Get payloads like the ones this package reads and writes"""
+    settings = {
+        "name": "app",
+        "version": "1.0.0",
+        "devtools": {
+            "commands": {"start": "python3 -m app", "stop": "pkill -f app", "setup": "pip install ."},
+            "readiness": {"timeout": 30, "checks": [{"type": "tcp", "port": 8000}]},
+        },
+    }
+    local_data = {
+        "data_path": "/home/user/.devtools",
+        "DBFilename": "devtools.db",
+        "pid": 12345,
+        "process_groups": {f"/home/user/.devtools/repositories/user/app{i}": 1000 + i
+                           for i in range(50)},
+    }
+    repository_rows = [{
+        "user": f"user{i % 10}",
+        "name": f"app{i}",
+        "path": f"/home/user/.devtools/repositories/user{i % 10}/app{i}",
+        "enabled": '{"type": "bool", "value": true}',
+        "setup_finalized": '{"type": "bool", "value": false}',
+    } for i in range(1000)]
+    return {
+        "settings.json": settings,
+        "local_data.json": local_data,
+        "repository rows": repository_rows,
+    }
+
+
+def benchmark_json_codecs(iterations: int = 1000, debug: bool = False):
+    """Compare the JsonCodec backends decoding and encoding representative payloads"""
+    if debug:
+        print("\nbenchmarks -> benchmark_json_codecs():")
+
+    from .. import JsonCodec
+
+    previous_backend = JsonCodec.backend
+    results = {}
+    try:
+        for name, payload in get_json_payloads().items():
+            encoded = JsonCodec.dumps(payload)
+            for backend in JsonCodec.get_backends():
+                JsonCodec.set_backend(backend)
+                if JsonCodec.loads(JsonCodec.dumps(payload)) != payload:
+                    raise Exception(f"The {backend} backend changed the {name} payload")
+
+                start = time.perf_counter()
+                for _ in range(iterations):
+                    JsonCodec.loads(encoded)
+                loads_elapsed = time.perf_counter() - start
+
+                start = time.perf_counter()
+                for _ in range(iterations):
+                    JsonCodec.dumps(payload)
+                dumps_elapsed = time.perf_counter() - start
+
+                results.setdefault(name, {})[backend] = {
+                    "loads_us": loads_elapsed * 1e6 / iterations,
+                    "dumps_us": dumps_elapsed * 1e6 / iterations,
+                }
+                print(f"[{name}] {backend}: "
+                      f"loads {loads_elapsed * 1e6 / iterations:.1f} us, "
+                      f"dumps {dumps_elapsed * 1e6 / iterations:.1f} us")
+    finally:
+        JsonCodec.set_backend(previous_backend)
+
+    return results
+
+
+def benchmark_db_tables(iterations: int = 1000, debug: bool = False):
+    """Instantiations per second of the dbs tables, creating a Sqlite3Utils every time
+    and sharing them through dbs.ConnectionPool"""
+    if debug:
+        print("\nbenchmarks -> benchmark_db_tables():")
+
+    from ..dbs import ConnectionPool
+    from ..dbs.RepositoriesTable import RepositoriesTable
+    from ..dbs.RepositoryMirror import RepositoryMirror
+    from ..dbs.RepositorySettings import RepositorySettings
+    from ..dbs.Settings import Settings
+
+    tables = [RepositoriesTable, RepositoryMirror, RepositorySettings, Settings]
+    previous_enabled = ConnectionPool.enabled
+    results = {}
+    try:
+        for mode, pooled in (("unpooled", False), ("pooled", True)):
+            ConnectionPool.set_enabled(pooled)
+            # Open the connections before measuring
+            for table in tables:
+                table()
+
+            start = time.perf_counter()
+            for _ in range(iterations):
+                for table in tables:
+                    table()
+            elapsed = time.perf_counter() - start
+
+            per_second = iterations * len(tables) / elapsed
+            results[mode] = {
+                "instantiations_per_second": per_second,
+                "instantiation_us": elapsed * 1e6 / (iterations * len(tables)),
+            }
+            print(f"{mode}: {per_second:.0f} instantiations/s, "
+                  f"{results[mode]['instantiation_us']:.1f} us each")
+    finally:
+        ConnectionPool.set_enabled(previous_enabled)
+        ConnectionPool.close_all()
+
+    results["speedup"] = (results["pooled"]["instantiations_per_second"]
+                          / results["unpooled"]["instantiations_per_second"])
+    print(f"Speedup: {results['speedup']:.1f}x")
+    return results
@@ -0,0 +1,367 @@
+"""Get notified when the configuration files change
+
+Watches the data path, the local data folder, the repositories folder and the
+settings.json of every repository, and pushes the changed paths to the
+subscribers(the settings cache, the AppManager registry, Routes, ...) so they
+can drop what they cached as soon as it changes.
+
+On linux it uses inotify through ctypes, otherwise(or if inotify can't be
+used) the watched folders are polled every poll_interval seconds.
+
+Folders are watched instead of files, because files are usually replaced by
+renaming a new file over them(see LocalData.write_file).
+
+Subscribers are called from the watcher thread with the path that changed, or
+with None if the changes were lost(the inotify queue overflowed) and
+everything must be considered changed.
+
+Example:
+```python
+from dev_tools_utils.data_configuration import ConfigWatcher
+
+ConfigWatcher.subscribe(lambda path: print("Changed: ", path))
+ConfigWatcher.start_watching()
+```
+
+Reference/s:
+https://man7.org/linux/man-pages/man7/inotify.7.html
+"""
+import ctypes
+import ctypes.util
+import os
+import selectors
+import struct
+import threading
+
+# inotify(7) constants
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+# Everything that changes the entries of a folder, but not every single write
+folder_mask = (IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE
+               | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+# wd, mask, cookie, len
+event_header = struct.Struct("iIII")
+
+# Called with every changed path, they are kept even if the watcher is not created yet
+subscribers: list = []
+subscribers_lock = threading.Lock()
+
+# Shared by the whole program
+shared_watcher = None
+shared_watcher_lock = threading.Lock()
+
+
+def subscribe(callback):
+    """Call the callback with every changed path"""
+    with subscribers_lock:
+        if callback not in subscribers:
+            subscribers.append(callback)
+
+
+def unsubscribe(callback):
+    """Stop calling the callback"""
+    with subscribers_lock:
+        if callback in subscribers:
+            subscribers.remove(callback)
+
+
+def get_shared_watcher():
+    """Get the watcher shared by the whole program"""
+    global shared_watcher
+    with shared_watcher_lock:
+        if not shared_watcher:
+            shared_watcher = ConfigWatcher()
+    return shared_watcher
+
+
+def load_inotify():
+    """Get libc if it has inotify, None otherwise"""
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+        return libc
+    except (OSError, AttributeError, TypeError):
+        return None
+
+
+def start_watching(repositories_path: str = None):
+    """Watch the data path, the local data and the repositories, and start the watcher
+
+    The settings cache and the local data cache are subscribed, so they drop the
+    documents of the changed files(they still check the files before using them)"""
+    from . import DataLocation
+    from . import LocalData
+    from . import SettingsCache
+
+    watcher = get_shared_watcher()
+    watcher.watch_directory(DataLocation.get_data_path())
+    local_settings_path = DataLocation.get_local_settings_path()
+    watcher.watch_file(local_settings_path)
+    watcher.watch_repositories(repositories_path or DataLocation.get_repositories_path())
+
+    subscribe(SettingsCache.invalidate)
+    subscribe(LocalData.invalidate_cached_data)
+    # What was cached before the watches were added may be outdated
+    SettingsCache.invalidate()
+    watcher.start()
+    return watcher
+
+
+class ConfigWatcher:
+    def __init__(self, poll_interval: float = 2.0, use_inotify: bool = True, debug: bool = False):
+        """Watches folders and notifies the subscribers of the changed paths"""
+        self.poll_interval = poll_interval
+        self.debug = debug
+
+        # Folder -> names to report(None reports every entry)
+        self.folders: dict = {}
+        # Folders whose new subfolders are watched too
+        self.recursive: set = set()
+        # Repositories folders, see watch_repositories()
+        self.repositories: set = set()
+        self.lock = threading.RLock()
+        self.thread = None
+        self.stop_event = threading.Event()
+
+        # inotify
+        self.fd = None
+        # Watch descriptor -> folder
+        self.descriptors: dict = {}
+        self.libc = load_inotify() if use_inotify else None
+        if self.libc:
+            fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if fd >= 0:
+                self.fd = fd
+            elif self.debug:
+                print("ConfigWatcher: inotify is not available, polling instead.")
+
+        # Polling, folder -> entry name -> (modification time, size, inode)
+        self.entries: dict = {}
+
+    def is_using_inotify(self) -> bool:
+        """Check if the changes arrive as events, instead of polling"""
+        return self.fd is not None
+
+    ################
+    ### Watching ###
+    ################
+    def watch_directory(self, path: str, recursive: bool = False):
+        """Notify the changes of every entry of a folder(and its subfolders if recursive)"""
+        path = os.path.abspath(path)
+        with self.lock:
+            self.add_folder(path, None)
+            if recursive:
+                self.recursive.add(path)
+                for folder, subfolders, _ in os.walk(path):
+                    for subfolder in subfolders:
+                        if subfolder != "__pycache__":
+                            self.add_folder(os.path.join(folder, subfolder), None)
+                            self.recursive.add(os.path.join(folder, subfolder))
+
+    def watch_file(self, path: str):
+        """Notify the changes of a file, its folder is watched"""
+        folder, name = os.path.split(os.path.abspath(path))
+        with self.lock:
+            names = self.folders.get(folder, set())
+            if names is not None:
+                names = names | {name}
+            self.add_folder(folder, names)
+
+    def watch_repositories(self, repositories_path: str):
+        """Notify when repositories are added or removed and when their settings.json changes
+
+        The layout is repositories/{user}/{repository}/settings.json"""
+        repositories_path = os.path.abspath(repositories_path)
+        with self.lock:
+            self.repositories.add(repositories_path)
+            self.watch_directory(repositories_path)
+            for user in os.scandir(repositories_path):
+                if user.is_dir():
+                    self.watch_user_repositories(user.path)
+
+    def watch_user_repositories(self, user_path: str):
+        """Watch the repositories of a user folder"""
+        self.watch_directory(user_path)
+        for repository in os.scandir(user_path):
+            if repository.is_dir():
+                self.watch_file(os.path.join(repository.path, "settings.json"))
+
+    def add_folder(self, folder: str, names):
+        """Watch a folder, it must be called holding the lock"""
+        is_new = folder not in self.folders
+        self.folders[folder] = names
+        if not is_new:
+            return
+
+        if self.is_using_inotify():
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(folder), folder_mask)
+            if wd < 0:
+                if self.debug:
+                    print(f"ConfigWatcher: Couldn't watch {folder}: "
+                          f"{os.strerror(ctypes.get_errno())}")
+                del self.folders[folder]
+                return
+            self.descriptors[wd] = folder
+        else:
+            self.entries[folder] = self.scan_folder(folder)
+
+    def remove_folder(self, folder: str, removed_by_kernel: bool = False):
+        """Stop watching a folder, it must be called holding the lock
+
+        removed_by_kernel is True if inotify already removed the watch(IN_IGNORED)"""
+        self.folders.pop(folder, None)
+        self.recursive.discard(folder)
+        self.entries.pop(folder, None)
+        for wd, watched_folder in list(self.descriptors.items()):
+            if watched_folder == folder:
+                del self.descriptors[wd]
+                if not removed_by_kernel:
+                    # A moved folder is still watched by the kernel until it's removed
+                    self.libc.inotify_rm_watch(self.fd, wd)
+
+    ###############
+    ### Running ###
+    ###############
+    def start(self):
+        """Start the watcher thread, if it's not running"""
+        with self.lock:
+            if self.thread and self.thread.is_alive():
+                return
+            self.stop_event.clear()
+            target = self.run_inotify if self.is_using_inotify() else self.run_polling
+            self.thread = threading.Thread(target=target, daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        """Stop the watcher thread"""
+        self.stop_event.set()
+
+    def notify(self, path):
+        """Call every subscriber with the changed path"""
+        if self.debug:
+            print("ConfigWatcher -> notify(): ", path)
+        with subscribers_lock:
+            callbacks = list(subscribers)
+        for callback in callbacks:
+            try:
+                callback(path)
+            except Exception as ex:
+                print("ConfigWatcher -> notify(): Exception: ", ex)
+
+    def run_inotify(self):
+        """Watcher thread, reading inotify events"""
+        selector = selectors.DefaultSelector()
+        selector.register(self.fd, selectors.EVENT_READ)
+        while not self.stop_event.is_set():
+            # The timeout is only used to check if it was stopped
+            if not selector.select(1.0):
+                continue
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                continue
+            for path in self.parse_events(data):
+                self.notify(path)
+
+    def parse_events(self, data: bytes) -> list:
+        """Get the changed paths of the inotify events, without repeating them"""
+        paths = []
+        offset = 0
+        while offset + event_header.size <= len(data):
+            wd, mask, _, length = event_header.unpack_from(data, offset)
+            offset += event_header.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                # The changes were lost, everything may have changed
+                paths.append(None)
+                continue
+
+            with self.lock:
+                folder = self.descriptors.get(wd)
+                if folder is None:
+                    continue
+                if mask & (IN_IGNORED | IN_DELETE_SELF | IN_MOVE_SELF):
+                    self.remove_folder(folder, removed_by_kernel=bool(mask & IN_IGNORED))
+                    path = folder
+                else:
+                    names = self.folders.get(folder)
+                    if names is not None and name not in names:
+                        continue
+                    path = os.path.join(folder, name) if name else folder
+                    if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                        self.on_new_folder(folder, path)
+
+            if path not in paths:
+                paths.append(path)
+        return paths
+
+    def on_new_folder(self, parent: str, path: str):
+        """Watch a new subfolder if its parent is watched recursively or it's a repository"""
+        if os.path.basename(path) == "__pycache__":
+            return
+        if parent in self.recursive:
+            self.watch_directory(path, recursive=True)
+        elif parent in self.repositories:
+            # A new user
+            self.watch_user_repositories(path)
+        elif os.path.dirname(parent) in self.repositories:
+            # A new repository of a user
+            self.watch_file(os.path.join(path, "settings.json"))
+
+    def scan_folder(self, folder: str) -> dict:
+        """Get the entries of a folder, used when polling"""
+        entries = {}
+        try:
+            for entry in os.scandir(folder):
+                try:
+                    stat = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                entries[entry.name] = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        except OSError:
+            pass
+        return entries
+
+    def run_polling(self):
+        """Watcher thread, comparing the entries of every folder"""
+        while not self.stop_event.wait(self.poll_interval):
+            changed = []
+            with self.lock:
+                for folder in list(self.folders):
+                    entries = self.scan_folder(folder)
+                    previous = self.entries.get(folder, {})
+                    names = self.folders.get(folder)
+                    for name in set(entries) | set(previous):
+                        if entries.get(name) == previous.get(name):
+                            continue
+                        if names is not None and name not in names:
+                            continue
+                        changed.append(os.path.join(folder, name))
+                    self.entries[folder] = entries
+
+                    # New subfolders
+                    if names is None:
+                        for name in set(entries) - set(previous):
+                            path = os.path.join(folder, name)
+                            if os.path.isdir(path):
+                                self.on_new_folder(folder, path)
+
+            for path in changed:
+                self.notify(path)
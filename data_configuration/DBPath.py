@@ -1,4 +1,3 @@
-import json
 import os
 
 from . import DataLocation
@@ -36,9 +35,8 @@ def get_full_db_path():
     # Get the filename of the DB
     db_filename = "devtools.db"
     try:
-        with open(LocalData.get_local_settings_path(), "r") as f:
-            local_data = json.load(f)
-            db_filename = local_data["DBFilename"] if local_data["DBFilename"] else "devtools.db"
+        local_data = LocalData.load_cached_data(DataLocation.get_local_settings_path())
+        db_filename = local_data["DBFilename"] if local_data["DBFilename"] else "devtools.db"
     except:
         db_filename = "devtools.db"
     db_path = get_sql_db_path(db_filename)
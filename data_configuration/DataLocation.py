@@ -1,11 +1,57 @@
+"""Where the data is stored
+
+Nothing is read or created when it's imported, local_settings_path is only
+created the first time it's used."""
 import os
-import json
 
 from . import LocalData
 
 
 filename = ".devtools"
-local_settings_path = LocalData.get_local_settings_path()
+# See get_local_settings_path()
+cached_local_settings_path = None
+
+
+def __getattr__(name: str):
+    """Module attributes that are only computed when they are used"""
+    if name == "local_settings_path":
+        return get_local_settings_path()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def get_local_settings_path() -> str:
+    """Get the local settings path, the file is created the first time"""
+    global cached_local_settings_path
+    if not cached_local_settings_path:
+        cached_local_settings_path = LocalData.get_local_settings_path()
+    return cached_local_settings_path
+
+
+class LazyPath:
+    def __init__(self, get_path):
+        """Class attribute whose value is computed the first time it's used
+
+        Example:
+        ```python
+        class RepositorySettings:
+            repositories_path = LazyPath(lambda: f"{get_data_path()}/repositories")
+        ```"""
+        self.get_path = get_path
+        self.name = None
+
+    def __set_name__(self, owner, name: str):
+        self.name = name
+
+    def __get__(self, instance, owner):
+        path = self.get_path()
+        # From now on it's a normal class attribute
+        setattr(owner, self.name, path)
+        return path
+
+
+def get_data_repositories_path() -> str:
+    """Get the repositories path under the data path, without creating it"""
+    return f"{get_data_path()}/repositories"
 
 
 def get_global_data_path():
@@ -35,12 +81,11 @@ def get_data_path() -> str:
     """Get data path
 
     Get the path where the data will be stored"""
-    with open(local_settings_path) as f:
-        try:
-            data = json.load(f)
-            data_path = data["data_path"]
-        except:
-            data_path = get_default_data_location()
+    try:
+        data = LocalData.load_cached_data(get_local_settings_path())
+        data_path = data["data_path"]
+    except:
+        data_path = get_default_data_location()
     return data_path
 
 
@@ -50,12 +95,11 @@ def get_repositories_path(debug=False):
         print("\nDataLocation -> get_default_path():")
 
     # This is cross-platform
-    with open(local_settings_path) as f:
-        try:
-            data = json.load(f)
-            data_path = data["data_path"]
-        except:
-            data_path = get_default_data_location()
+    try:
+        data = LocalData.load_cached_data(get_local_settings_path())
+        data_path = data["data_path"]
+    except:
+        data_path = get_default_data_location()
     my_repositories = f"{data_path}{os.path.sep}repositories"
 
     if not os.path.exists(data_path):
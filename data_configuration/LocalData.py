@@ -1,11 +1,47 @@
 """Get local data configuration
 
-This data is temporary, and must not be submitted to a version hosting service like GitHub"""
+This data is temporary, and must not be submitted to a version hosting service like GitHub
+
+The file is written atomically, to a temporary file which is renamed over it, so a crash
+while writing never leaves it truncated.
+
+With write behind(see set_write_behind), save_data() only merges the new data in memory
+and the file is written once after a short delay, so many saves in a row cost a single
+write. Readers of this process see the pending data immediately, flush() writes it now.
+
+Many processes write the file(the app, devtools, ...), writers hold an advisory lock on
+'local_data.json.lock' while they read, merge and write it, so no update is lost. Readers
+never lock, every write publishes a whole new file(a new inode), so they always read a
+consistent version, and the version(modification time, size and inode) tells them
+when they need to parse it again."""
+import atexit
 import os
-import json
+import tempfile
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    # Not available on windows, only the writers of this process are serialized
+    fcntl = None
+
+from .. import JsonCodec
 
 filename = "local_data.json"
 
+# Path -> (file key, data), see load_cached_data()
+cached_data: dict = {}
+cached_data_lock = threading.Lock()
+
+# Seconds to wait before writing the pending data, None writes immediately
+write_behind_delay = None
+# Path -> data not written yet
+pending_data: dict = {}
+# Path -> timer that will write it
+flush_timers: dict = {}
+# Held while the file is read and written back, so no save is lost
+write_lock = threading.RLock()
+
 
 def get_local_settings_path() -> str:
     """Get local settings path
@@ -28,6 +64,213 @@ def load_data():
     return LocalData(create_if_not_existent=True).load_data()
 
 
+def update_data(update, debug: bool = False):
+    """Change the data in place while holding the lock
+
+    The update function is called with the current data and modifies it, use it
+    when the new data depends on the old one(e.g. adding an item to a dictionary)"""
+    return LocalData(create_if_not_existent=True).update_data(update)
+
+
+def set_write_behind(delay: float = 0.1):
+    """Merge the saved data in memory and write it after delay seconds
+
+    If delay is None, the data is written on every save again"""
+    global write_behind_delay
+    write_behind_delay = delay
+    if delay is None:
+        flush()
+
+
+def get_pending_data(path: str) -> dict:
+    """Get the data saved on this process that's not written yet"""
+    with write_lock:
+        return dict(pending_data.get(path, {}))
+
+
+def read_file(path: str) -> dict:
+    """Read a local data file, an empty dictionary if it doesn't exist"""
+    data = {}
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            data = JsonCodec.load(f)
+
+    # It's a string somehow
+    if isinstance(data, str):
+        data = JsonCodec.loads(data)
+    return data
+
+
+def get_file_mode(path: str) -> int:
+    """Get the permissions of a file, or the ones a new file would get(0o666 without the umask)"""
+    try:
+        return os.stat(path).st_mode & 0o7777
+    except OSError:
+        pass
+
+    try:
+        with open("/proc/self/status", "rb") as f:
+            for line in f:
+                if line.startswith(b"Umask:"):
+                    return 0o666 & ~int(line.split()[1], 8)
+    except (OSError, ValueError, IndexError):
+        pass
+    # The umask can only be read by changing it
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+def write_file(path: str, data: dict):
+    """Write a local data file atomically
+
+    The data is written to a temporary file on the same folder, synced to the disk and
+    renamed over the file, keeping the permissions of the file"""
+    folder = os.path.dirname(path)
+    mode = get_file_mode(path)
+    fd, temporary_path = tempfile.mkstemp(
+        dir=folder, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        if hasattr(os, "fchmod"):
+            # mkstemp creates it only readable by the owner
+            os.fchmod(fd, mode)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            JsonCodec.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary_path, path)
+    except BaseException:
+        try:
+            os.remove(temporary_path)
+        except OSError:
+            pass
+        raise
+
+    # The rename itself is stored on the folder
+    try:
+        folder_fd = os.open(folder, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(folder_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(folder_fd)
+
+
+class FileLock:
+    def __init__(self, path: str):
+        """Advisory lock between processes, held on 'path.lock'
+
+        The file itself can't be locked, it's replaced on every write"""
+        self.lock_path = f"{path}.lock"
+        self.fd = None
+
+    def __enter__(self):
+        write_lock.acquire()
+        if fcntl:
+            try:
+                self.fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+                fcntl.flock(self.fd, fcntl.LOCK_EX)
+            except BaseException:
+                if self.fd is not None:
+                    os.close(self.fd)
+                    self.fd = None
+                write_lock.release()
+                raise
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.fd is not None:
+            # Closing it releases the lock
+            os.close(self.fd)
+            self.fd = None
+        write_lock.release()
+        return False
+
+
+def merge_into_file(path: str, new_data: dict):
+    """Write the new data into a local data file, keeping the old data
+
+    The file is read again while holding the lock, so the changes of other
+    processes are kept"""
+    with FileLock(path):
+        data = {
+            **read_file(path),
+            **new_data,
+        }
+        write_file(path, data)
+
+
+def flush(path: str = None):
+    """Write the pending data now, of a single file or every file if no path is given"""
+    with write_lock:
+        paths = [path] if path else list(pending_data.keys())
+        for pending_path in paths:
+            timer = flush_timers.pop(pending_path, None)
+            if timer:
+                timer.cancel()
+            new_data = pending_data.pop(pending_path, None)
+            if new_data:
+                merge_into_file(pending_path, new_data)
+
+
+# Nothing saved is lost when the program ends
+atexit.register(flush)
+
+
+def get_file_key(path: str) -> tuple:
+    """Get what identifies a version of a file, its modification time, size and inode"""
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+def load_cached_data(path: str):
+    """Load the data of a local data file, it's only parsed again if the file changed
+
+    The file is checked with a single os.stat, returns None if it doesn't exist or
+    it's not valid json. The pending data of this process is included.
+    The data is shared by every caller, it must not be modified."""
+    pending = pending_data.get(path)
+    if pending:
+        data = load_cached_file(path)
+        return {**(data if isinstance(data, dict) else {}), **get_pending_data(path)}
+    return load_cached_file(path)
+
+
+def load_cached_file(path: str):
+    """Load the data of a local data file as it is on the disk, see load_cached_data()"""
+    try:
+        key = get_file_key(path)
+    except OSError:
+        return None
+
+    with cached_data_lock:
+        cached = cached_data.get(path)
+    if cached and cached[0] == key:
+        return cached[1]
+
+    try:
+        with open(path, "rb") as f:
+            data = JsonCodec.load(f)
+    except (OSError, ValueError):
+        return None
+
+    with cached_data_lock:
+        cached_data[path] = (key, data)
+    return data
+
+
+def invalidate_cached_data(path: str = None):
+    """Discard the cached data of a file, or of every file if no path is given"""
+    with cached_data_lock:
+        if path is None:
+            cached_data.clear()
+        else:
+            cached_data.pop(path, None)
+
+
 class LocalData:
     """Local data
 
@@ -54,21 +297,27 @@ class LocalData:
 
         self.file_path = f"{local_folder}{os.path.sep}{filename}"
         if not os.path.exists(self.file_path):
+            self.create_file(folder)
+
+    def create_file(self, folder: str):
+        """Create the local data file, another process may be creating it too"""
+        with FileLock(self.file_path):
+            if os.path.exists(self.file_path):
+                return
+
             # App settings path
             app_settings = f"{folder}{os.path.sep}settings.json"
             if os.path.exists(app_settings):
                 # Load data
-                with open(app_settings) as f:
-                    data = json.load(f)
+                with open(app_settings, "rb") as f:
+                    data = JsonCodec.load(f)
 
                 # Insert the data onto the local file
-                with open(self.file_path, "w") as f:
-                    json.dump(data, f)
+                write_file(self.file_path, data)
             else:
                 # settings.json doesn't exist
                 # Then we will create an empty file
-                with open(self.file_path, "w") as f:
-                    json.dump({}, f)
+                write_file(self.file_path, {})
 
     def get_local_settings_path(self):
         """Get local settings file path"""
@@ -77,31 +326,57 @@ class LocalData:
     def save_data(self, new_data: dict):
         """Save data without removing old data
 
-        Instead, it replaces the old data with the new data if it was given"""
-        data = {}
-        # If there's already data there, load it
-        if os.path.exists(self.file_path):
-            with open(self.file_path) as f:
-                data = json.load(f)
+        Instead, it replaces the old data with the new data if it was given.
+        With write behind, it's written after a short delay"""
+        if write_behind_delay is None:
+            merge_into_file(self.file_path, new_data)
+            return
+
+        with write_lock:
+            pending_data.setdefault(self.file_path, {}).update(new_data)
+            # Written once after the first save, with every save until then
+            if self.file_path not in flush_timers:
+                timer = threading.Timer(write_behind_delay, flush, [self.file_path])
+                timer.daemon = True
+                flush_timers[self.file_path] = timer
+                timer.start()
 
-        # It's a string somehow
-        if isinstance(data, str):
-            data = json.loads(data)
+    def update_data(self, update):
+        """Change the data in place while holding the lock
 
-        # Save the filename so it can be loaded somewhere else
-        with open(self.file_path, "w") as f:
+        The update function is called with the current data and modifies it"""
+        with FileLock(self.file_path):
+            # The pending data goes first, it was saved before
             data = {
-                **data,
-                **new_data,
+                **read_file(self.file_path),
+                **pending_data.get(self.file_path, {}),
             }
-            json.dump(data, f)
+            update(data)
+            write_file(self.file_path, data)
+
+            # It's only discarded once it's written, if the update fails it's kept
+            pending_data.pop(self.file_path, None)
+            timer = flush_timers.pop(self.file_path, None)
+            if timer:
+                timer.cancel()
+
+    def flush(self):
+        """Write the pending data of this file now"""
+        flush(self.file_path)
 
     def load_data(self):
-        """Load local data"""
+        """Load local data, including the data that's not written yet"""
         data = None
-        with open(self.file_path, "r") as f:
+        with open(self.file_path, "rb") as f:
             try:
-                data = json.load(f)
+                data = JsonCodec.load(f)
             except Exception as ex:
                 print("Couldn't load previous data, exception: ", ex)
+
+        pending = get_pending_data(self.file_path)
+        if pending:
+            data = {
+                **(data if isinstance(data, dict) else {}),
+                **pending,
+            }
         return data
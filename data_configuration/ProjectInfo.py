@@ -1,6 +1,7 @@
-"""Get important project information stored on the given app/project path"""
-import json
-import os
+"""Get important project information stored on the given app/project path
+
+The settings.json is read through the shared SettingsCache, the data is read-only"""
+from . import SettingsCache
 
 
 class ProjectInfo:
@@ -12,18 +13,17 @@ class ProjectInfo:
         self.debug = debug
 
         try:
-            with open(f"{path}{os.path.sep}settings.json", "r") as f:
-                self.info = json.load(f)["devtools"]
+            self.info = SettingsCache.get_app_settings(path)["devtools"]
         except Exception as ex:
             raise Exception(f"The app at {self.path} is not DevTools compatible.")
 
     def load_settings_data(self, key: str):
         """Load settings data"""
-        with open(f"{self.path}{os.path.sep}settings.json", "r") as f:
-            try:
-                return json.load(f)[key]
-            except:
-                pass
+        settings = SettingsCache.get_app_settings(self.path)
+        try:
+            return settings[key]
+        except:
+            pass
         return None
 
     def get_commands(self):
@@ -54,6 +54,16 @@ class ProjectInfo:
             print(ex)
             return None
 
+    def get_readiness(self):
+        """Get the readiness checks settings
+
+        Returns None if the app doesn't declare them"""
+        try:
+            return self.info.get("readiness")
+        except Exception as ex:
+            print(ex)
+            return None
+
     def get_info(self):
         """Get info"""
         return self.info
@@ -1,6 +1,5 @@
 """Get important project information stored on the given app/project path"""
-import json
-import os
+from . import SettingsCache
 
 
 class ProjectSettings:
@@ -12,8 +11,8 @@ class ProjectSettings:
         self.debug = debug
 
         try:
-            with open(f"{path}{os.path.sep}settings.json") as f:
-                self.settings = json.load(f)
+            # Shared and read-only
+            self.settings = SettingsCache.get_app_settings(path)
         except Exception as ex:
             raise Exception(f"The app at {self.path} is not DevTools compatible.")
 
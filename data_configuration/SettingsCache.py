@@ -0,0 +1,132 @@
+"""Parsed settings.json documents shared by the whole program
+
+ProjectInfo, ProjectSettings, VersionManager and LocalRepository read the
+settings.json of the apps through here, every file is parsed once and kept
+on an LRU cache until its modification time, size or inode changes.
+Every get() checks the file with a single os.stat, so a file written by this
+process is read again right away. ConfigWatcher also invalidates the files it
+watches as soon as they change, to free the outdated documents.
+
+The documents are shared, so they are read-only:
+dictionaries are ReadOnlyDict and lists are tuples, they are still json
+serializable, use copy.deepcopy() to get a normal mutable copy.
+"""
+import copy
+import os
+import threading
+from collections import OrderedDict
+
+from .. import JsonCodec
+
+filename = "settings.json"
+default_capacity = 1024
+
+
+class ReadOnlyDict(dict):
+    """Dictionary that can't be modified"""
+    __slots__ = ()
+
+    def read_only(self, *args, **kwargs):
+        raise TypeError("The settings are shared and read-only, use copy.deepcopy() "
+                        "to get a mutable copy.")
+
+    __setitem__ = read_only
+    __delitem__ = read_only
+    __ior__ = read_only
+    clear = read_only
+    pop = read_only
+    popitem = read_only
+    setdefault = read_only
+    update = read_only
+
+    def __copy__(self):
+        return dict(self)
+
+    def __deepcopy__(self, memo):
+        return {key: copy.deepcopy(value, memo) for key, value in self.items()}
+
+    def __reduce__(self):
+        return dict, (dict(self),)
+
+
+def freeze(data):
+    """Get a read-only version of parsed json"""
+    if isinstance(data, dict):
+        return ReadOnlyDict((key, freeze(value)) for key, value in data.items())
+    if isinstance(data, list):
+        return tuple(freeze(value) for value in data)
+    return data
+
+
+class SettingsCache:
+    def __init__(self, capacity: int = default_capacity):
+        """Path keyed LRU of parsed json files"""
+        self.capacity = capacity
+        # Path -> (file key, document), the most recently used last
+        self.documents: OrderedDict = OrderedDict()
+        self.lock = threading.Lock()
+        self.parses = 0
+        # Path -> times it was invalidated, and times everything was invalidated, so a
+        # document read before an invalidation is not stored after it
+        self.invalidations: dict = {}
+        self.generation = 0
+
+    def get(self, path: str):
+        """Get the read-only document of a json file
+
+        Raises the same exceptions as opening and parsing it(OSError, ValueError)"""
+        with self.lock:
+            version = (self.generation, self.invalidations.get(path, 0))
+
+        stat = os.stat(path)
+        key = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+        with self.lock:
+            cached = self.documents.get(path)
+            if cached and cached[0] == key:
+                self.documents.move_to_end(path)
+                return cached[1]
+
+        with open(path, "rb") as f:
+            document = freeze(JsonCodec.load(f))
+
+        with self.lock:
+            self.parses += 1
+            if version != (self.generation, self.invalidations.get(path, 0)):
+                # It changed while it was read, it may be the old content
+                return document
+            self.documents[path] = (key, document)
+            self.documents.move_to_end(path)
+            while len(self.documents) > self.capacity:
+                self.documents.popitem(last=False)
+        return document
+
+    def invalidate(self, path: str = None):
+        """Discard the document of a file, or every document if no path is given"""
+        with self.lock:
+            if path is None:
+                self.documents.clear()
+                self.invalidations.clear()
+                self.generation += 1
+            else:
+                self.documents.pop(path, None)
+                self.invalidations[path] = self.invalidations.get(path, 0) + 1
+
+
+# Shared by the whole program
+shared_cache = SettingsCache()
+
+
+def get_settings(path: str):
+    """Get the read-only document of a json file, from the shared cache"""
+    return shared_cache.get(path)
+
+
+def get_app_settings(app_path: str):
+    """Get the read-only settings.json of the app at the given path"""
+    return shared_cache.get(f"{app_path}{os.path.sep}{filename}")
+
+
+def invalidate(path: str = None):
+    """Discard a file of the shared cache, or every file if no path is given"""
+    shared_cache.invalidate(path)
@@ -0,0 +1,74 @@
+"""Sqlite3Utils objects shared by the dbs tables
+
+Every table class used to create its own Sqlite3Utils(and open the database
+again) on every instantiation, now they are created once per thread, database
+path and table, and reused by every table object of that thread.
+They are per thread because sqlite connections can't be used by other threads.
+
+The objects of a thread are discarded when the thread ends, close_all() closes
+every one of them(it's called when the program ends too).
+"""
+import atexit
+import threading
+import weakref
+
+from ...py_sqlite3_utils import Sqlite3Utils
+
+# If False a new Sqlite3Utils is created every time, see benchmarks.benchmark_db_tables()
+enabled = True
+
+# Thread -> (db path, table, parse_json, debug) -> Sqlite3Utils
+local = threading.local()
+# Every shared Sqlite3Utils, they are kept alive by their thread
+created = weakref.WeakSet()
+created_lock = threading.Lock()
+# Incremented by close_all(), so every thread drops its closed objects
+generation = 0
+
+
+def set_enabled(value: bool):
+    """Share the Sqlite3Utils objects or create a new one every time"""
+    global enabled
+    enabled = value
+
+
+def get_sqlite3_utils(db_path: str, table: str, parse_json: bool = False,
+                      debug: bool = False) -> Sqlite3Utils:
+    """Get the Sqlite3Utils of a table of this thread"""
+    if not enabled:
+        return Sqlite3Utils(db_path, table, parse_json=parse_json, debug=debug)
+
+    if getattr(local, "generation", None) != generation:
+        local.utils = {}
+        local.generation = generation
+
+    key = (db_path, table, parse_json, debug)
+    utils = local.utils.get(key)
+    if utils is None:
+        utils = Sqlite3Utils(db_path, table, parse_json=parse_json, debug=debug)
+        local.utils[key] = utils
+        with created_lock:
+            created.add(utils)
+    return utils
+
+
+def close_all():
+    """Close every shared Sqlite3Utils, they are created again the next time
+
+    The table objects created before keep the closed ones, create them again"""
+    global generation
+    with created_lock:
+        generation += 1
+        utils_list = list(created)
+        created.clear()
+
+    for utils in utils_list:
+        close = getattr(utils, "close", None)
+        if callable(close):
+            try:
+                close()
+            except Exception as ex:
+                print("ConnectionPool -> close_all(): Exception: ", ex)
+
+
+atexit.register(close_all)
@@ -1,9 +1,9 @@
-from ...py_sqlite3_utils import Sqlite3Utils
+from . import ConnectionPool
 from ..data_configuration import DataLocation, DBPath
 
 
 class RepositoriesTable:
-    repositories_path = f"{DataLocation.get_data_path()}/repositories"
+    repositories_path = DataLocation.LazyPath(DataLocation.get_data_repositories_path)
 
     def __init__(self, db_name: str = "repositories", debug: bool = False):
         self.db_name = db_name
@@ -14,7 +14,7 @@ class RepositoriesTable:
 
         # Get the filename of the DB
         db_path = DBPath.get_full_db_path()
-        self.sql_repository_settings = Sqlite3Utils(
+        self.sql_repository_settings = ConnectionPool.get_sqlite3_utils(
             db_path,
             self.db_name,
             parse_json=True,
@@ -1,11 +1,29 @@
 import os
+import threading
 
-from ...py_sqlite3_utils import Sqlite3Utils
+from . import ConnectionPool
 from ..data_configuration import DataLocation, DBPath
 
+# Incremented every time this process changes a row, so cached repository
+# settings(e.g. AppManager.for_path) know they are outdated
+generation = 0
+generation_lock = threading.Lock()
+
+
+def get_generation() -> int:
+    """Get how many times the repository settings were changed by this process"""
+    return generation
+
+
+def increment_generation():
+    """Mark the cached repository settings as outdated"""
+    global generation
+    with generation_lock:
+        generation += 1
+
 
 class RepositorySettings:
-    repositories_path = f"{DataLocation.get_data_path()}/repositories"
+    repositories_path = DataLocation.LazyPath(DataLocation.get_data_repositories_path)
 
     def __init__(self, debug: bool = False):
         self.debug = debug
@@ -17,7 +35,7 @@ class RepositorySettings:
 
         # Get the filename of the DB
         db_path = DBPath.get_full_db_path()
-        self.sql_repository_settings = Sqlite3Utils(
+        self.sql_repository_settings = ConnectionPool.get_sqlite3_utils(
             db_path,
             self.table,
             parse_json=True,
@@ -57,12 +75,15 @@ class RepositorySettings:
             DELETE FROM {self.table}
                 WHERE (user='{username}' AND name='{repository_name}');
             """)
+        increment_generation()
 
     def upsert(self, data: dict, filterA: dict):
         """Insert or replace data"""
         if self.debug:
             print("RepositorySettings -> upsert():")
-        return self.sql_repository_settings.insert_replace_v2(data, filterA)
+        result = self.sql_repository_settings.insert_replace_v2(data, filterA)
+        increment_generation()
+        return result
 
     def set_default_path(self, username: str, repository_name: str):
         """Set path to default path"""
@@ -74,6 +95,7 @@ class RepositorySettings:
             {
                 "name": repository_name,
             })
+        increment_generation()
 
     def set_default_path_for_every_repository(self):
         """Set default path for every repository"""
@@ -94,3 +116,4 @@ class RepositorySettings:
                     "name": repository_name
                 }
             )
+        increment_generation()
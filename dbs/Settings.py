@@ -1,4 +1,4 @@
-from ...py_sqlite3_utils import Sqlite3Utils
+from . import ConnectionPool
 from ..data_configuration import DBPath
 
 
@@ -6,7 +6,7 @@ class Settings:
     def __init__(self, debug: bool = False):
         # Get the filename of the DB
         db_path = DBPath.get_full_db_path()
-        self.sql_settings_table = Sqlite3Utils(
+        self.sql_settings_table = ConnectionPool.get_sqlite3_utils(
             db_path,
             "settings",
             parse_json=True,
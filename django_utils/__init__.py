@@ -1,13 +1,12 @@
-import json
-
 from django.http import HttpRequest, HttpResponse
 
+from .. import JsonCodec
 from ..Debug import Debug
 
 
 def get_json_response(data: dict):
     """Get a Django json response with the given data"""
-    res = HttpResponse(json.dumps(data))
+    res = HttpResponse(JsonCodec.dumps(data))
     res.headers["Content-Type"] = "application/json"
     return res
 
@@ -1,9 +1,8 @@
-import json
-
 from django.http import HttpRequest
 
 from ...django_utils import DjangoUtils
 from ...Debug import Debug
+from ... import JsonCodec
 
 
 def validate_plain_text_content_type(request: HttpRequest):
@@ -71,7 +70,7 @@ class Main:
 
             # If there is "debug" in data it means that there was an error
             if not "debug" in data:
-                body: dict = json.loads(request.body.decode("utf-8"))
+                body: dict = JsonCodec.loads(request.body)
 
                 # Check if the required data was given
                 try:
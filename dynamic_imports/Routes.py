@@ -86,23 +86,63 @@ Get server routes for python servers
         ```python
         routes_dictionary["test"].get()
         ```
+3.2. Reloading
+    With watch=True the routes folder is watched(see data_configuration.ConfigWatcher),
+    when a file changes the routes are marked as outdated and they are imported again
+    the next time a route is requested. Use [OBJECT].reload() to do it manually.
 """
 import importlib.util
 import os
 
+from ..data_configuration import ConfigWatcher
+
 
 class Routes:
-    def __init__(self, starting_path: str, use_full_routes: bool = False, debug: bool = False):
+    def __init__(self, starting_path: str, use_full_routes: bool = False, debug: bool = False,
+                 watch: bool = False):
         """Routes object
 
         IF use_full_routes is True, the dictionary indexes will be, the full route instead
         of being nested.
+        IF watch is True, the routes are imported again when their files change.
         """
         self.starting_path = starting_path
         self.use_full_routes = use_full_routes
         self.debug = debug
 
         self.routes = self.get_routes()
+        self.outdated = False
+        if watch:
+            self.watch()
+
+    def watch(self):
+        """Import the routes again when their files change"""
+        watcher = ConfigWatcher.get_shared_watcher()
+        watcher.watch_directory(self.starting_path, recursive=True)
+        ConfigWatcher.subscribe(self.on_change)
+        watcher.start()
+
+    def stop_watching(self):
+        """Stop receiving the changes of the routes files"""
+        ConfigWatcher.unsubscribe(self.on_change)
+
+    def on_change(self, path: str):
+        """Mark the routes as outdated if the changed path is inside the routes folder
+
+        It's called from the watcher thread, the routes are imported on the next request"""
+        if path is None:
+            self.outdated = True
+            return
+        if "__pycache__" in path.split(os.path.sep):
+            return
+        starting_path = os.path.abspath(self.starting_path)
+        if path == starting_path or path.startswith(f"{starting_path}{os.path.sep}"):
+            self.outdated = True
+
+    def reload(self):
+        """Import the routes again"""
+        self.outdated = False
+        self.routes = self.get_routes()
 
     def get_routes(self):
         """Dynamic routes importing
@@ -215,6 +255,9 @@ class Routes:
             route_object.post()
         ```
         """
+        if self.outdated:
+            self.reload()
+
         # Get the route by parts
         paths = [_ for _ in route.split("/") if _]
         msg = f"Unknown error or route '{route}' not found."
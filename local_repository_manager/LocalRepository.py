@@ -1,7 +1,7 @@
-import json
 import os
 
 from ..app_manager import AppManager
+from ..data_configuration import SettingsCache
 
 
 class LocalRepository:
@@ -23,23 +23,23 @@ class LocalRepository:
     def is_devtools_compatible(self):
         """Check if the app is devtools compatible"""
         try:
-            with open(self.path) as f:
-                data = json.load(f)
-                if data["devtools"]:
-                    return True
+            # Parsed once, until the settings.json changes
+            data = SettingsCache.get_app_settings(self.path)
+            if data["devtools"]:
+                return True
         except:
             pass
         return False
 
     def restart_app(self):
         """Restart the app at the given path"""
-        return AppManager(self.path).restart_app()
+        return AppManager.for_path(self.path).restart_app()
 
     def start_app(self):
         """Start the app"""
-        return AppManager(self.path).start_app()
+        return AppManager.for_path(self.path).start_app()
 
     def stop_app(self):
         """Stop app"""
-        return AppManager(self.path).stop_app()
+        return AppManager.for_path(self.path).stop_app()
 
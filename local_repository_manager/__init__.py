@@ -5,7 +5,7 @@ from .LocalRepository import LocalRepository
 
 
 class LocalRepositoryManager:
-    path: str = DataLocation.get_repositories_path()
+    path: str = DataLocation.LazyPath(DataLocation.get_repositories_path)
 
     users = []
     debug = False
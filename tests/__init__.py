@@ -1,6 +1,18 @@
+import os
 import pprint
+import subprocess
+import sys
+import tempfile
+import time
 
-from ..data_configuration import DataLocation, DBPath
+from .. import JsonCodec
+from .. import OStuff
+from ..app_manager import AppLogs
+from ..app_manager import ProcessRecord
+from ..app_manager.CwdIndex import CwdIndex
+from ..app_manager.ProcessSnapshot import ProcessSnapshot
+from ..app_manager.ResourceSampler import RingBuffer, percentile
+from ..data_configuration import DataLocation, DBPath, LocalData
 from ..local_repository_manager import LocalRepositoryManager
 from ..dynamic_imports.Routes import Routes
 
@@ -92,6 +104,240 @@ def test_dynamic_imports_routes(routes_path: str, show_output: bool = False, deb
         print("Exception: ", ex)
 
 
+def test_process_snapshot_exec(show_output: bool = False, debug: bool = False):
+    """A known process that changes its cwd and executes another program is seen
+    with its new cwd and cmdline"""
+    if debug:
+        print("\ntests -> test_process_snapshot_exec():")
+
+    with tempfile.TemporaryDirectory() as app_path:
+        app_path = os.path.realpath(app_path)
+        child = subprocess.Popen([
+            sys.executable, "-c",
+            "import os, sys, time; time.sleep(0.5); os.chdir(sys.argv[1]); "
+            "os.execvp('sleep', ['sleep', '30'])",
+            app_path])
+        try:
+            snapshot = ProcessSnapshot(ttl=60)
+            # The child is known before it executes sleep
+            snapshot.get_processes(fresh=True)
+            time.sleep(1)
+
+            try:
+                assert snapshot.get_cwd_index(fresh=True).is_running(app_path)
+                print("[OK] ProcessSnapshot.get_cwd_index() (after chdir)")
+            except Exception:
+                print("[Failed] ProcessSnapshot.get_cwd_index() (after chdir)")
+
+            try:
+                out = snapshot.get_processes_info_by_name("sleep 30", ["pid", "args"])
+                assert str(child.pid) in [info["pid"] for info in out]
+                print("[OK] ProcessSnapshot.get_processes_info_by_name() (after exec)")
+                if show_output:
+                    pprint.pprint(out)
+            except Exception:
+                print("[Failed] ProcessSnapshot.get_processes_info_by_name() (after exec)")
+        finally:
+            child.kill()
+            child.wait()
+
+
+def test_cwd_index(show_output: bool = False, debug: bool = False):
+    if debug:
+        print("\ntests -> test_cwd_index():")
+
+    processes = [
+        {"pid": 1, "cwd": "/repos/user/app"},
+        {"pid": 2, "cwd": "/repos/user/app/src"},
+        {"pid": 3, "cwd": "/repos/user/app2"},
+        {"pid": 4, "cwd": None},
+    ]
+    try:
+        index = CwdIndex(processes)
+        assert index.get_pids("/repos/user/app") == [1, 2]
+        assert index.get_pids("/repos/user/app", subfolders=False) == [1]
+        assert index.get_pids_by_paths(["/repos/user/app2", "/other"]) == {
+            "/repos/user/app2": [3],
+            "/other": [],
+        }
+        assert index.is_running("/repos/user/app2")
+        assert not index.is_running("/repos/user/ap")
+        print("[OK] CwdIndex")
+        if show_output:
+            pprint.pprint(list(zip(index.keys, index.pids)))
+    except Exception as ex:
+        print("[Failed] CwdIndex")
+        print("Exception: ", ex)
+
+
+def test_process_record(show_output: bool = False, debug: bool = False):
+    if debug:
+        print("\ntests -> test_process_record():")
+
+    fields = ["pid", "comm", "args"]
+    output = "  1 bash /bin/bash  \n\n 20 python3 python3 -m http.server  \n 30\n"
+    try:
+        rows = ProcessRecord.split_lines(output, fields)
+        assert rows == [
+            ["1", "bash", "/bin/bash"],
+            ["20", "python3", "python3 -m http.server"],
+            ["30"],
+        ]
+        print("[OK] ProcessRecord.split_lines()")
+        if show_output:
+            pprint.pprint(rows)
+    except Exception as ex:
+        print("[Failed] ProcessRecord.split_lines()")
+        print("Exception: ", ex)
+
+    try:
+        records = ProcessRecord.parse_records(output, fields)
+        assert records[1]["args"] == "python3 -m http.server"
+        # Incomplete lines don't have the last fields
+        assert records[2].to_dict() == {"pid": "30"}
+        assert "args" not in records[2]
+        table = ProcessRecord.parse_table(output, fields)
+        assert table.get_column("pid") == ("1", "20", "30")
+        assert [record.to_dict() for record in table] == [record.to_dict() for record in records]
+        print("[OK] ProcessRecord.parse_records() and parse_table()")
+    except Exception as ex:
+        print("[Failed] ProcessRecord.parse_records() and parse_table()")
+        print("Exception: ", ex)
+
+
+def test_split_command(show_output: bool = False, debug: bool = False):
+    if debug:
+        print("\ntests -> test_split_command():")
+
+    commands = {
+        "npm start": ["npm", "start"],
+        "python3 -m 'http.server' 8000": ["python3", "-m", "http.server", "8000"],
+        "npm install && npm start": None,
+        "cat app.log | grep error": None,
+        "cd server": None,
+        "time npm start": None,
+        "PORT=8000 npm start": None,
+        "echo 'unbalanced": None,
+        "": None,
+    }
+    try:
+        out = {command: OStuff.split_command(command) for command in commands}
+        assert out == commands
+        print("[OK] OStuff.split_command()")
+        if show_output:
+            pprint.pprint(out)
+    except Exception as ex:
+        print("[Failed] OStuff.split_command()")
+        print("Exception: ", ex)
+
+
+def test_ring_buffer(show_output: bool = False, debug: bool = False):
+    if debug:
+        print("\ntests -> test_ring_buffer():")
+
+    try:
+        buffer = RingBuffer("d", 3)
+        buffer.append(1)
+        assert buffer.to_list() == [1] and len(buffer) == 1
+        for value in range(2, 6):
+            buffer.append(value)
+        # The oldest values were overwritten
+        assert buffer.to_list() == [3, 4, 5] and len(buffer) == 3
+        print("[OK] RingBuffer")
+        if show_output:
+            print(buffer.to_list())
+    except Exception as ex:
+        print("[Failed] RingBuffer")
+        print("Exception: ", ex)
+
+    try:
+        values = list(range(1, 11))
+        assert percentile(values, 50) == 5
+        assert percentile(values, 90) == 9
+        assert percentile(values, 100) == 10
+        assert percentile(values, 0) == 1
+        assert percentile([], 50) is None
+        print("[OK] percentile()")
+    except Exception as ex:
+        print("[Failed] percentile()")
+        print("Exception: ", ex)
+
+
+def test_json_codec(show_output: bool = False, debug: bool = False):
+    if debug:
+        print("\ntests -> test_json_codec():")
+
+    payload = {
+        "devtools": {"commands": {"start": "npm start"}, "readiness": {"timeout": 30}},
+        "list": [1, 2.5, None, True, "ñ"],
+        "big": 2 ** 70,
+    }
+    previous_backend = JsonCodec.backend
+    try:
+        for backend in JsonCodec.get_backends():
+            JsonCodec.set_backend(backend)
+            try:
+                assert JsonCodec.loads(JsonCodec.dumps(payload)) == payload
+                assert JsonCodec.loads(JsonCodec.dumps(payload).encode("utf-8")) == payload
+                assert JsonCodec.dumps(payload, indent=4).startswith("{\n")
+                print(f"[OK] JsonCodec round trip ({backend})")
+            except Exception as ex:
+                print(f"[Failed] JsonCodec round trip ({backend})")
+                print("Exception: ", ex)
+    finally:
+        JsonCodec.set_backend(previous_backend)
+
+
+def test_tail_file(show_output: bool = False, debug: bool = False):
+    if debug:
+        print("\ntests -> test_tail_file():")
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "app.log")
+        lines = [f"line {i}" for i in range(1000)]
+        with open(path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+
+        try:
+            # Small blocks, so it's read backwards in many steps
+            out = AppLogs.tail_file(path, 5, block_size=16)
+            assert out == lines[-5:]
+            assert AppLogs.tail_file(path, 2000) == lines
+            assert AppLogs.tail_file(path, 0) == []
+            assert AppLogs.tail_file(os.path.join(folder, "missing.log")) == []
+            print("[OK] AppLogs.tail_file()")
+            if show_output:
+                pprint.pprint(out)
+        except Exception as ex:
+            print("[Failed] AppLogs.tail_file()")
+            print("Exception: ", ex)
+
+
+def test_local_data_merge(show_output: bool = False, debug: bool = False):
+    if debug:
+        print("\ntests -> test_local_data_merge():")
+
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "local_data.json")
+        try:
+            assert LocalData.read_file(path) == {}
+            LocalData.write_file(path, {"data_path": "/data", "DBFilename": "devtools.db"})
+            LocalData.merge_into_file(path, {"DBFilename": "other.db", "new": 1})
+            out = LocalData.read_file(path)
+            assert out == {"data_path": "/data", "DBFilename": "other.db", "new": 1}
+            # The temporary files were renamed over the file
+            assert not [name for name in os.listdir(folder) if name.endswith(".tmp")]
+            assert LocalData.load_cached_data(path) == out
+            print("[OK] LocalData.merge_into_file()")
+            if show_output:
+                pprint.pprint(out)
+        except Exception as ex:
+            print("[Failed] LocalData.merge_into_file()")
+            print("Exception: ", ex)
+        finally:
+            LocalData.invalidate_cached_data(path)
+
+
 class Tests:
     def __init__(self, debug: bool = False):
         pass